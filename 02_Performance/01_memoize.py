@@ -0,0 +1,531 @@
+#* Bounded, thread-safe memoization
+# The memoize decorator in 01_Basic/07_decorators.py keeps every result forever
+# in a plain dict and prints on every call. This version bounds the cache by
+# entry count, by (approximate) bytes and by age, lets you choose which entry
+# is evicted first, and reports counters through cache_info() instead of print.
+# `async def` functions and async generators get async wrappers that cache
+# awaited results (see 19_async_decorators.py).
+
+import asyncio
+import importlib
+import sys
+import threading
+import time
+from collections import OrderedDict, defaultdict, namedtuple
+from functools import wraps
+
+async_support = importlib.import_module("19_async_decorators")
+
+CacheInfo = namedtuple(
+    "CacheInfo",
+    ["hits", "misses", "evictions", "currsize", "maxsize", "currbytes", "maxbytes"],
+)
+
+# Separates positional from keyword arguments inside a cache key, so that
+# f(1, ("a", 2)) and f(1, a=2) never share an entry.
+_KWD_MARK = object()
+
+
+def make_key(args, kwargs):
+    """Build a hashable cache key from positional and keyword arguments."""
+    key = args
+    if kwargs:
+        key += (_KWD_MARK,) + tuple(sorted(kwargs.items()))
+    return key
+
+
+# ---------------------------------------------------------------------------
+# Eviction policies
+# ---------------------------------------------------------------------------
+# A policy only tracks keys; the cache owns the values. Every method is called
+# with the cache lock held, so policies do not need their own locking.
+
+class LRUPolicy:
+    """Evict the least recently used key."""
+
+    def __init__(self):
+        self._order = OrderedDict()
+
+    def insert(self, key):
+        self._order[key] = None
+
+    def touch(self, key):
+        self._order.move_to_end(key)
+
+    def remove(self, key):
+        del self._order[key]
+
+    def victim(self):
+        return next(iter(self._order))
+
+    def clear(self):
+        self._order.clear()
+
+
+class LFUPolicy:
+    """Evict the least frequently used key (ties go to the oldest key)."""
+
+    def __init__(self):
+        self._freq = {}
+        self._buckets = defaultdict(OrderedDict)
+        self._min_freq = 0
+
+    def insert(self, key):
+        self._freq[key] = 1
+        self._buckets[1][key] = None
+        self._min_freq = 1
+
+    def touch(self, key):
+        freq = self._freq[key]
+        self._unlink(key, freq)
+        if self._min_freq not in self._buckets:
+            self._min_freq = freq + 1
+        self._freq[key] = freq + 1
+        self._buckets[freq + 1][key] = None
+
+    def remove(self, key):
+        self._unlink(key, self._freq.pop(key))
+        if self._min_freq not in self._buckets:
+            self._min_freq = min(self._buckets, default=0)
+
+    def victim(self):
+        return next(iter(self._buckets[self._min_freq]))
+
+    def clear(self):
+        self._freq.clear()
+        self._buckets.clear()
+        self._min_freq = 0
+
+    def _unlink(self, key, freq):
+        bucket = self._buckets[freq]
+        del bucket[key]
+        if not bucket:
+            del self._buckets[freq]
+
+
+class TTLPolicy(LRUPolicy):
+    """Evict the key closest to expiry.
+
+    Every entry gets the same time-to-live, so insertion order is expiry
+    order and hits must not reorder anything.
+    """
+
+    def touch(self, key):
+        pass
+
+
+POLICIES = {"lru": LRUPolicy, "lfu": LFUPolicy, "ttl": TTLPolicy}
+
+
+# ---------------------------------------------------------------------------
+# Single-flight
+# ---------------------------------------------------------------------------
+# When many callers miss the same key at once, only the first one (the leader)
+# runs the function. Everyone else waits for the leader and shares its result
+# or its exception. Nothing is remembered once the call finishes, so errors
+# are never cached.
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Deduplicate concurrent calls with the same key across threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn, /, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+
+class AsyncSingleFlight:
+    """Deduplicate concurrent awaits with the same key on one event loop."""
+
+    def __init__(self):
+        self._calls = {}
+
+    async def do(self, key, fn, /, *args, **kwargs):
+        future = self._calls.get(key)
+        if future is not None:
+            # shield() keeps a cancelled waiter from cancelling the leader.
+            return await asyncio.shield(future)
+
+        future = self._calls[key] = asyncio.get_running_loop().create_future()
+        try:
+            result = await fn(*args, **kwargs)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()      # mark retrieved even if nobody waited
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
+
+
+# ---------------------------------------------------------------------------
+# The decorator
+# ---------------------------------------------------------------------------
+
+def memoize(func=None, *, maxsize=128, maxbytes=None, ttl=None, policy="lru",
+            single_flight=False, sizeof=sys.getsizeof, timer=time.monotonic):
+    """
+    Cache results of func, keyed by its positional and keyword arguments.
+
+    Args:
+        maxsize (int | None): Maximum number of entries, None for no limit
+        maxbytes (int | None): Maximum total size of cached values as
+            measured by sizeof, None for no limit
+        ttl (float | None): Seconds an entry stays valid, None for forever
+        policy (str | type): "lru", "lfu", "ttl" or a policy class
+        single_flight (bool): Let only one thread (or task, for coroutine
+            functions) compute a missing key while the others wait for its
+            result (or its exception); ignored for async generators
+        sizeof (callable): Size estimate of a value; sys.getsizeof is shallow
+        timer (callable): Monotonic clock used for ttl
+
+    Returns:
+        The wrapped function with cache_info(), cache_clear() and
+        cache_parameters() attached. Expired entries count as evictions.
+    """
+    if isinstance(policy, str):
+        try:
+            policy_cls = POLICIES[policy]
+        except KeyError:
+            raise ValueError(f"Unknown eviction policy: {policy!r}") from None
+    else:
+        policy_cls = policy
+
+    def decorator(f):
+        data = {}                   # key -> (value, expires_at, size)
+        order = policy_cls()
+        lock = threading.Lock()
+        hits = misses = evictions = currbytes = 0
+
+        kind = async_support.function_kind(f)
+        if not single_flight:
+            flights = None
+        elif kind == async_support.COROUTINE:
+            flights = AsyncSingleFlight()
+        else:
+            flights = SingleFlight()
+        missing = object()
+
+        def discard(key):
+            nonlocal currbytes
+            currbytes -= data.pop(key)[2]
+            order.remove(key)
+
+        def lookup(key):
+            nonlocal evictions
+            entry = data.get(key)
+            if entry is not None:
+                if entry[1] is None or entry[1] > timer():
+                    order.touch(key)
+                    return entry[0]
+                discard(key)
+                evictions += 1
+            return missing
+
+        def store(key, value):
+            nonlocal evictions, currbytes
+            size = sizeof(value)
+            if (maxbytes is not None and size > maxbytes) or maxsize == 0:
+                return
+            with lock:
+                if key in data:
+                    discard(key)    # another thread stored it meanwhile
+                # Make room before inserting, so the new key is never its own
+                # victim (under LFU it would have the lowest frequency).
+                while data and ((maxsize is not None and len(data) >= maxsize)
+                                or (maxbytes is not None and currbytes + size > maxbytes)):
+                    discard(order.victim())
+                    evictions += 1
+                expires_at = None if ttl is None else timer() + ttl
+                data[key] = (value, expires_at, size)
+                order.insert(key)
+                currbytes += size
+
+        def compute(key, args, kwargs):
+            if flights is not None:
+                # A previous leader may have stored the value between our
+                # miss and our becoming leader.
+                with lock:
+                    value = lookup(key)
+                if value is not missing:
+                    return value
+            value = f(*args, **kwargs)
+            store(key, value)
+            return value
+
+        async def compute_async(key, args, kwargs):
+            if flights is not None:
+                with lock:
+                    value = lookup(key)
+                if value is not missing:
+                    return value
+            value = await f(*args, **kwargs)
+            store(key, value)
+            return value
+
+        def cached(key):
+            nonlocal hits, misses
+            with lock:
+                value = lookup(key)
+                if value is missing:
+                    misses += 1
+                else:
+                    hits += 1
+            return value
+
+        if kind == async_support.COROUTINE:
+            # Cache the awaited result: a coroutine object can only be
+            # awaited once.
+            @wraps(f)
+            async def wrapper(*args, **kwargs):
+                key = make_key(args, kwargs)
+                value = cached(key)
+                if value is not missing:
+                    return value
+                if flights is None:
+                    return await compute_async(key, args, kwargs)
+                return await flights.do(key, compute_async, key, args, kwargs)
+
+        elif kind == async_support.ASYNC_GENERATOR:
+            # Items are stored once the generator has been consumed to the
+            # end; a caller that stops early leaves nothing in the cache.
+            @wraps(f)
+            async def wrapper(*args, **kwargs):
+                key = make_key(args, kwargs)
+                items = cached(key)
+                if items is missing:
+                    items = []
+                    async for item in f(*args, **kwargs):
+                        items.append(item)
+                        yield item
+                    store(key, tuple(items))
+                else:
+                    for item in items:
+                        yield item
+
+        else:
+            @wraps(f)
+            def wrapper(*args, **kwargs):
+                nonlocal hits, misses
+                key = make_key(args, kwargs)
+                with lock:
+                    value = lookup(key)
+                    if value is not missing:
+                        hits += 1
+                        return value
+                    misses += 1
+
+                # The lock is released while computing, so recursive functions
+                # work and slow calls do not block hits on other keys.
+                if flights is None:
+                    return compute(key, args, kwargs)
+                return flights.do(key, compute, key, args, kwargs)
+
+        def cache_info():
+            with lock:
+                return CacheInfo(hits, misses, evictions, len(data), maxsize,
+                                 currbytes, maxbytes)
+
+        def cache_clear():
+            nonlocal hits, misses, evictions, currbytes
+            with lock:
+                data.clear()
+                order.clear()
+                hits = misses = evictions = currbytes = 0
+
+        def cache_parameters():
+            return {"maxsize": maxsize, "maxbytes": maxbytes, "ttl": ttl,
+                    "policy": policy_cls.__name__,
+                    "single_flight": single_flight}
+
+        wrapper.cache_info = cache_info
+        wrapper.cache_clear = cache_clear
+        wrapper.cache_parameters = cache_parameters
+        return wrapper
+
+    if func is None:
+        # Called with arguments: @memoize(maxsize=...)
+        return decorator
+    # Called without arguments: @memoize
+    return decorator(func)
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("1. DROP-IN REPLACEMENT")
+    print("=" * 60)
+
+    @memoize
+    def fibonacci(n):
+        if n < 2:
+            return n
+        return fibonacci(n - 1) + fibonacci(n - 2)
+
+    print(f"fibonacci(80) = {fibonacci(80)}")
+    print(f"cache_info() = {fibonacci.cache_info()}")
+
+    print("\n" + "=" * 60)
+    print("2. KEYWORD ARGUMENTS")
+    print("=" * 60)
+
+    @memoize(maxsize=4)
+    def power(base, exp=2):
+        return base ** exp
+
+    print(f"power(3) = {power(3)}, power(3, exp=3) = {power(3, exp=3)}")
+    print(f"power(3, exp=3) again = {power(3, exp=3)}")
+    print(f"cache_info() = {power.cache_info()}")
+
+    print("\n" + "=" * 60)
+    print("3. LRU vs LFU EVICTION")
+    print("=" * 60)
+
+    for name in ("lru", "lfu"):
+        @memoize(maxsize=2, policy=name)
+        def square(x):
+            return x * x
+
+        square(1), square(1), square(1)    # 1 is hot
+        square(2)                          # 2 is the most recent
+        square(3)                          # one of them has to go
+        square(1)
+        print(f"{name}: after re-reading 1 -> {square.cache_info()}")
+
+    print("\n" + "=" * 60)
+    print("4. TTL AND BYTE BOUNDS")
+    print("=" * 60)
+
+    @memoize(ttl=0.05, maxbytes=10_000)
+    def make_blob(n):
+        return "x" * n
+
+    make_blob(100)
+    make_blob(100)
+    time.sleep(0.06)
+    make_blob(100)                         # expired, computed again
+    make_blob(50_000)                      # larger than maxbytes, never stored
+    print(f"cache_info() = {make_blob.cache_info()}")
+
+    print("\n" + "=" * 60)
+    print("5. CONCURRENT USE")
+    print("=" * 60)
+
+    @memoize(maxsize=64, policy="lfu")
+    def slow_square(x):
+        return x * x
+
+    def worker():
+        for i in range(10_000):
+            assert slow_square(i % 50) == (i % 50) ** 2
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    info = slow_square.cache_info()
+    print(f"cache_info() = {info}")
+    print(f"hit rate = {info.hits / (info.hits + info.misses):.1%}")
+
+    print("\n" + "=" * 60)
+    print("6. SINGLE-FLIGHT (NO THUNDERING HERD)")
+    print("=" * 60)
+
+    for flag in (False, True):
+        computed = []
+
+        @memoize(single_flight=flag)
+        def load_config(name):
+            computed.append(name)
+            time.sleep(0.05)                # an expensive lookup
+            return {"name": name}
+
+        threads = [threading.Thread(target=load_config, args=("prod",))
+                   for _ in range(20)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        print(f"single_flight={flag}: 20 concurrent misses -> "
+              f"{len(computed)} computation(s)")
+
+    # Errors reach every waiter and are not cached.
+    attempts = []
+
+    @memoize(single_flight=True)
+    def flaky(key):
+        attempts.append(key)
+        time.sleep(0.05)
+        if len(attempts) == 1:
+            raise ConnectionError("backend down")
+        return "ok"
+
+    errors = []
+
+    def call_flaky():
+        try:
+            flaky("a")
+        except ConnectionError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call_flaky) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    print(f"5 waiters on a failing call -> {len(errors)} errors, "
+          f"{len(attempts)} attempt(s)")
+    print(f"next call retries: flaky('a') = {flaky('a')!r}")
+
+    # Coroutine functions get AsyncSingleFlight: one task fetches, the
+    # others await its result.
+    @memoize(single_flight=True)
+    async def fetch(user_id):
+        attempts.append(user_id)
+        await asyncio.sleep(0.05)
+        return f"user-{user_id}"
+
+    async def main():
+        attempts.clear()
+        results = await asyncio.gather(*(fetch(user_id) for user_id in [7] * 10))
+        print(f"10 concurrent awaits -> {len(attempts)} fetch, {set(results)}")
+        print(f"awaited again: {await fetch(7)!r}, {fetch.cache_info()}")
+
+    asyncio.run(main())
@@ -0,0 +1,391 @@
+#* Persistent, cross-process memoization
+# memoize and lru_cache only live inside one process: every worker in a pool
+# and every restart starts cold. DiskCache stores results in a local SQLite
+# file instead. SQLite already handles locking between processes, so any
+# number of workers can read and write the same cache safely.
+#
+# Three things make a disk cache trustworthy:
+#   1. Stable keys   - the same arguments must hash the same way in every
+#                      process and on every run (hash() is randomized per
+#                      process, and pickle output is not canonical).
+#   2. A size bound  - least recently used entries are evicted past maxbytes.
+#   3. Versioning    - entries record a fingerprint of the function's code,
+#                      so editing the function invalidates its old results.
+
+import hashlib
+import os
+import pickle
+import sqlite3
+import tempfile
+import threading
+import time
+import types
+from collections import namedtuple
+from functools import wraps
+
+DiskCacheInfo = namedtuple("DiskCacheInfo", ["hits", "misses", "entries", "bytes", "maxbytes"])
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    func     TEXT    NOT NULL,
+    key      BLOB    NOT NULL,
+    version  TEXT    NOT NULL,
+    value    BLOB    NOT NULL,
+    size     INTEGER NOT NULL,
+    accessed REAL    NOT NULL,
+    PRIMARY KEY (func, key)
+);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed);
+
+-- Running total of entries.size, kept by triggers so eviction never has to
+-- sum the whole table. Every process sees the same total.
+CREATE TABLE IF NOT EXISTS totals (
+    id    INTEGER PRIMARY KEY CHECK (id = 0),
+    bytes INTEGER NOT NULL
+);
+CREATE TRIGGER IF NOT EXISTS entries_insert AFTER INSERT ON entries
+BEGIN UPDATE totals SET bytes = bytes + NEW.size; END;
+CREATE TRIGGER IF NOT EXISTS entries_delete AFTER DELETE ON entries
+BEGIN UPDATE totals SET bytes = bytes - OLD.size; END;
+CREATE TRIGGER IF NOT EXISTS entries_update AFTER UPDATE OF size ON entries
+BEGIN UPDATE totals SET bytes = bytes - OLD.size + NEW.size; END;
+INSERT OR IGNORE INTO totals SELECT 0, COALESCE(SUM(size), 0) FROM entries;
+"""
+
+# Hits only rewrite the access time when it is older than this many seconds,
+# so hot keys do not turn every read into a write.
+_TOUCH_INTERVAL = 1.0
+
+
+# ---------------------------------------------------------------------------
+# Stable key hashing
+# ---------------------------------------------------------------------------
+
+def _encode(obj, out):
+    t = type(obj)
+    if obj is None:
+        out.append(b"N")
+    elif t is bool:
+        out.append(b"T" if obj else b"F")
+    elif t is int:
+        out += (b"i", str(obj).encode(), b";")
+    elif t is float:
+        out += (b"f", obj.hex().encode(), b";")
+    elif t is str or t is bytes:
+        data = obj.encode("utf-8") if t is str else obj
+        out += (b"s" if t is str else b"b", str(len(data)).encode(), b":", data)
+    elif t is tuple or t is list:
+        out.append(b"(" if t is tuple else b"[")
+        for item in obj:
+            _encode(item, out)
+        out.append(b")")
+    elif t is dict:
+        out.append(b"{")
+        for k, v in sorted((stable_encode(k), stable_encode(v)) for k, v in obj.items()):
+            out += (k, v)
+        out.append(b"}")
+    elif t is set or t is frozenset:
+        out.append(b"<")
+        out.extend(sorted(stable_encode(item) for item in obj))
+        out.append(b">")
+    else:
+        raise TypeError(f"Cannot build a stable cache key from {t.__name__}")
+
+
+def stable_encode(obj):
+    """Encode builtin values into bytes that are identical in every process."""
+    out = []
+    _encode(obj, out)
+    return b"".join(out)
+
+
+def stable_key(args, kwargs):
+    """Hash call arguments into a 16-byte digest that survives restarts."""
+    return hashlib.blake2b(stable_encode((args, kwargs)), digest_size=16).digest()
+
+
+def _canonical(const, out):
+    # repr() is not stable for every constant: nested code objects (lambdas,
+    # comprehensions, generator expressions) show their memory address, and
+    # a frozenset (`x in {"a", "b"}`) lists its items in hash-seed order.
+    t = type(const)
+    if t is types.CodeType:
+        out += (b"<code", const.co_code, repr(const.co_names).encode())
+        for item in const.co_consts:
+            _canonical(item, out)
+        out.append(b">")
+    elif t is tuple:
+        out.append(b"(")
+        for item in const:
+            _canonical(item, out)
+        out.append(b")")
+    elif t is frozenset:
+        items = []
+        for item in const:
+            encoded = []
+            _canonical(item, encoded)
+            items.append(b"".join(encoded))
+        out += (b"{", *sorted(items), b"}")
+    else:
+        out += (repr(const).encode(), b";")
+
+
+def code_version(func):
+    """Fingerprint a function's bytecode and constants, nested code included."""
+    out = []
+    _canonical(func.__code__, out)
+    return hashlib.blake2b(b"".join(out), digest_size=8).hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# The cache
+# ---------------------------------------------------------------------------
+
+class DiskCache:
+    """
+    A size-bounded result cache in a SQLite file, shared by processes.
+
+    Args:
+        path (str): Location of the database file
+        maxbytes (int | None): Upper bound on the total pickled size of
+            stored values, None for no limit
+    """
+
+    def __init__(self, path, maxbytes=64 * 1024 * 1024):
+        self.path = path
+        self.maxbytes = maxbytes
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self._purged = set()            # (func, version) pairs already purged
+
+    def _connect(self):
+        # sqlite3 connections may not cross threads or a fork, so each
+        # (process, thread) pair opens its own.
+        local = self._local
+        if getattr(local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            local.conn, local.pid = conn, os.getpid()
+        return local.conn
+
+    def get(self, func_name, key, version):
+        """Return (True, value) on a hit, (False, None) on a miss."""
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT value, version, accessed FROM entries WHERE func = ? AND key = ?",
+            (func_name, key),
+        ).fetchone()
+        if row is not None:
+            blob, stored_version, accessed = row
+            if stored_version == version:
+                now = time.time()
+                if now - accessed > _TOUCH_INTERVAL:
+                    conn.execute(
+                        "UPDATE entries SET accessed = ? WHERE func = ? AND key = ?",
+                        (now, func_name, key),
+                    )
+                try:
+                    value = pickle.loads(blob)
+                except Exception:
+                    pass                # written by an incompatible build
+                else:
+                    self._count(hit=True)
+                    return True, value
+            conn.execute("DELETE FROM entries WHERE func = ? AND key = ?", (func_name, key))
+        self._count(hit=False)
+        return False, None
+
+    def set(self, func_name, key, version, value):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if self.maxbytes is not None and len(blob) > self.maxbytes:
+            return
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # An upsert, not INSERT OR REPLACE: REPLACE's implicit delete
+            # would skip the trigger that keeps the byte total.
+            conn.execute(
+                "INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (func, key) DO UPDATE SET version = excluded.version, "
+                "value = excluded.value, size = excluded.size, accessed = excluded.accessed",
+                (func_name, key, version, blob, len(blob), time.time()),
+            )
+            if self.maxbytes is not None:
+                self._evict(conn)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _evict(self, conn):
+        (total,) = conn.execute("SELECT bytes FROM totals").fetchone()
+        excess = total - self.maxbytes
+        if excess <= 0:
+            return
+        victims = []
+        for func_name, key, size in conn.execute(
+            "SELECT func, key, size FROM entries ORDER BY accessed"
+        ):
+            victims.append((func_name, key))
+            excess -= size
+            if excess <= 0:
+                break
+        conn.executemany("DELETE FROM entries WHERE func = ? AND key = ?", victims)
+
+    def purge_stale(self, func_name, version):
+        """Drop entries of func_name written by other versions of its code."""
+        self._connect().execute(
+            "DELETE FROM entries WHERE func = ? AND version != ?", (func_name, version)
+        )
+        self._purged.add((func_name, version))
+
+    def clear(self):
+        self._connect().execute("DELETE FROM entries")
+        with self._stats_lock:
+            self.hits = self.misses = 0
+
+    def info(self):
+        """Entry and byte totals are shared; hits and misses are per process."""
+        entries, size = self._connect().execute(
+            "SELECT COUNT(*), (SELECT bytes FROM totals) FROM entries"
+        ).fetchone()
+        return DiskCacheInfo(self.hits, self.misses, entries, size, self.maxbytes)
+
+    def _count(self, hit):
+        with self._stats_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def memoize(self, func=None, *, version=None):
+        """
+        Cache func's results in this DiskCache.
+
+        Args:
+            version (str | None): Explicit version tag; by default the
+                function's bytecode fingerprint is used, so any edit to the
+                function body invalidates its entries
+        """
+        def decorator(f):
+            func_name = f"{f.__module__}.{f.__qualname__}"
+            func_version = version if version is not None else code_version(f)
+            @wraps(f)
+            def wrapper(*args, **kwargs):
+                # Once per cache object; forked workers inherit the record.
+                if (func_name, func_version) not in self._purged:
+                    self.purge_stale(func_name, func_version)
+                key = stable_key(args, kwargs)
+                hit, value = self.get(func_name, key, func_version)
+                if hit:
+                    return value
+                value = f(*args, **kwargs)
+                self.set(func_name, key, func_version, value)
+                return value
+
+            wrapper.cache = self
+            wrapper.cache_info = self.info
+            return wrapper
+
+        if func is None:
+            return decorator
+        return decorator(func)
+
+
+# The demo function lives at module level so pool workers can find it under
+# any multiprocessing start method.
+DEMO_CACHE = DiskCache(os.path.join(tempfile.gettempdir(), "persistent_cache_demo.sqlite3"),
+                       maxbytes=256 * 1024)
+
+
+@DEMO_CACHE.memoize
+def slow_square(x):
+    time.sleep(0.01)
+    return x * x
+
+
+@DEMO_CACHE.memoize
+def sum_of_squares(n):
+    return sum(i * i for i in range(n))     # a nested code object
+
+
+@DEMO_CACHE.memoize
+def count_vowels(text):
+    return sum(ch in {"a", "e", "i", "o", "u"} for ch in text)   # a frozenset constant
+
+
+if __name__ == "__main__":
+    import subprocess
+    import sys
+    from multiprocessing import Pool
+
+    print("=" * 60)
+    print("1. STABLE KEYS")
+    print("=" * 60)
+
+    print(f"stable_key((1, 'a'), {{}}) = {stable_key((1, 'a'), {}).hex()}")
+    print(f"dict order does not matter: "
+          f"{stable_key((), {'a': 1, 'b': 2}) == stable_key((), {'b': 2, 'a': 1})}")
+    print(f"1 and 1.0 stay distinct:    {stable_key((1,), {}) != stable_key((1.0,), {})}")
+
+    print("\n" + "=" * 60)
+    print("2. SHARED BY A PROCESS POOL")
+    print("=" * 60)
+
+    DEMO_CACHE.clear()
+    for run in (1, 2):
+        start = time.perf_counter()
+        with Pool(4) as pool:
+            results = pool.map(slow_square, range(100))
+        elapsed = time.perf_counter() - start
+        print(f"run {run}: sum = {sum(results)}, {elapsed:.2f}s, {DEMO_CACHE.info()}")
+
+    print("\n" + "=" * 60)
+    print("3. VERSIONING")
+    print("=" * 60)
+
+    def price(n):
+        return n * 10
+
+    cached_price = DEMO_CACHE.memoize(price)
+    print(f"v1: price(3) = {cached_price(3)}")
+
+    def price(n):                       # the function body changed
+        return n * 12
+
+    cached_price = DEMO_CACHE.memoize(price)
+    print(f"v2: price(3) = {cached_price(3)} (stale v1 entry ignored)")
+
+    print("\n" + "=" * 60)
+    print("4. SIZE-BOUNDED EVICTION")
+    print("=" * 60)
+
+    @DEMO_CACHE.memoize
+    def blob(n):
+        return bytes(10_000) + str(n).encode()
+
+    for i in range(100):
+        blob(i)
+    print(f"after 100 x 10KB values: {DEMO_CACHE.info()}")
+
+    print("\n" + "=" * 60)
+    print("5. SURVIVES A RESTART")
+    print("=" * 60)
+
+    # Two fresh interpreters with different hash seeds: the second must be
+    # answered from the first's entries.
+    script = ("import importlib; m = importlib.import_module('02_persistent_cache'); "
+              "m.sum_of_squares(1000); m.count_vowels('persistent'); "
+              "print(m.DEMO_CACHE.info().hits)")
+    here = os.path.dirname(os.path.abspath(__file__))
+    DEMO_CACHE.clear()
+    hits = [subprocess.run([sys.executable, "-c", script], cwd=here, check=True,
+                           env={**os.environ, "PYTHONHASHSEED": seed},
+                           capture_output=True, text=True).stdout.strip()
+            for seed in ("1", "2")]
+    print(f"code_version stable across processes; hits per run: {hits}")
+    assert hits == ["0", "2"], hits
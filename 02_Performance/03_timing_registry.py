@@ -0,0 +1,405 @@
+#* Low-overhead timing registry
+# The timer decorator in 01_Basic/07_decorators.py uses time.time() and prints
+# one line per call. time.time() follows the wall clock (it can jump) and has
+# coarse resolution on some platforms, and printing costs far more than most
+# functions being measured.
+#
+# This registry instead:
+#   - reads time.perf_counter_ns(), a monotonic integer nanosecond clock
+#   - records into fixed-size log-linear histograms (~3% bucket error), so
+#     memory does not grow with the number of calls
+#   - gives every thread its own histogram, so recording never takes a lock;
+#     the shards are merged only when somebody asks for a snapshot, and a
+#     thread's shard is folded into a shared one when the thread exits
+#   - times `async def` functions around the await (19_async_decorators.py)
+#
+# Cost: a timed call pays for two perf_counter_ns() reads, the *args/**kwargs
+# forwarding every wrapper has, and the histogram update (a thread-local
+# read and two list increments, inlined in the wrapper). On the VM this was
+# measured on that came to ~1-1.5 us per timed call against ~170 ns for the
+# bare call, and about half of it was the two clock reads, whose cost
+# depends on the platform (demo section 2 prints the breakdown). Time
+# functions that do real work, not nanosecond helpers in tight loops.
+
+import importlib
+import json
+import threading
+import weakref
+from collections import namedtuple
+from contextlib import contextmanager
+from functools import wraps
+from time import perf_counter_ns
+
+async_support = importlib.import_module("19_async_decorators")
+
+TimingStats = namedtuple(
+    "TimingStats", ["count", "total_ns", "mean_ns", "p50_ns", "p90_ns", "p99_ns", "max_ns"]
+)
+
+# Values below 2**SUB_BITS get one bucket each; every power of two above that
+# is split into 2**(SUB_BITS - 1) linear sub-buckets.
+SUB_BITS = 5
+_LINEAR = 1 << SUB_BITS                 # 32 exact buckets: 0..31 ns
+_HALF = _LINEAR >> 1                    # 16 sub-buckets per octave
+NUM_BUCKETS = _LINEAR + 64 * _HALF      # covers every 64-bit duration
+
+
+TOTAL = NUM_BUCKETS                     # counts[TOTAL]: sum of all durations
+
+
+def bucket_index(ns):
+    if ns < _LINEAR:
+        return ns
+    shift = ns.bit_length() - SUB_BITS
+    return shift * _HALF + (ns >> shift)
+
+
+def bucket_bounds(index):
+    """Return the inclusive (low, high) nanosecond range of a bucket."""
+    if index < _LINEAR:
+        return index, index
+    shift, sub = divmod(index - _LINEAR, _HALF)
+    shift += 1
+    low = (sub + _HALF) << shift
+    return low, low + (1 << shift) - 1
+
+
+class Histogram:
+    """
+    Fixed-memory latency histogram owned by a single thread.
+
+    Everything lives in one list, the bucket counts followed by the total,
+    so recording is two list increments. The count is the sum of the
+    buckets, and max is the upper bound of the highest non-empty bucket.
+    """
+
+    __slots__ = ("counts",)
+
+    def __init__(self):
+        self.counts = [0] * (NUM_BUCKETS + 1)
+
+    def clear(self):
+        # In place: timer wrappers hold on to the list itself.
+        self.counts[:] = [0] * (NUM_BUCKETS + 1)
+
+    @property
+    def count(self):
+        return sum(self.counts[:TOTAL])
+
+    @property
+    def total(self):
+        return self.counts[TOTAL]
+
+    @property
+    def max(self):
+        counts = self.counts
+        for i in range(TOTAL - 1, -1, -1):
+            if counts[i]:
+                return bucket_bounds(i)[1]
+        return 0
+
+    def record(self, ns):
+        # bucket_index() inlined; the sync timer wrapper inlines all of this.
+        counts = self.counts
+        if ns < _LINEAR:
+            counts[ns] += 1
+        else:
+            shift = ns.bit_length() - SUB_BITS
+            counts[shift * _HALF + (ns >> shift)] += 1
+        counts[TOTAL] += ns
+
+    def merge(self, other):
+        counts = self.counts
+        for i, n in enumerate(other.counts):        # the total included
+            if n:
+                counts[i] += n
+
+    def percentile(self, q, count=None):
+        """Estimate the q-th percentile (0-100) as the bucket midpoint."""
+        count = self.count if count is None else count
+        if not count:
+            return 0
+        rank = max(1, -(-count * q // 100))     # ceil without floats
+        seen = 0
+        for i, n in enumerate(self.counts[:TOTAL]):
+            seen += n
+            if seen >= rank:
+                low, high = bucket_bounds(i)
+                return (low + high) // 2
+        return 0
+
+    def stats(self):
+        count, total = self.count, self.total
+        return TimingStats(
+            count,
+            total,
+            total // count if count else 0,
+            self.percentile(50, count),
+            self.percentile(90, count),
+            self.percentile(99, count),
+            self.max,
+        )
+
+
+class _ShardOwner:
+    """Lives in a thread's local storage; goes away when the thread ends."""
+
+    __slots__ = ("__weakref__",)
+
+
+class _Metric:
+    """All per-thread histograms recorded under one name."""
+
+    __slots__ = ("local", "shards", "base", "lock")
+
+    def __init__(self):
+        self.local = threading.local()
+        self.shards = []
+        self.base = Histogram()     # what threads that have exited recorded
+        self.lock = threading.Lock()
+
+    def shard(self):
+        hist = Histogram()
+        owner = _ShardOwner()
+        with self.lock:
+            self.shards.append(hist)
+        # When the thread exits its locals are dropped, and with them the
+        # owner: fold the shard into base so memory stays bounded under
+        # thread churn.
+        weakref.finalize(owner, self.retire, hist)
+        self.local.hist, self.local.counts, self.local.owner = hist, hist.counts, owner
+        return hist
+
+    def retire(self, hist):
+        with self.lock:
+            self.shards.remove(hist)
+            self.base.merge(hist)
+
+    def merged(self):
+        total = Histogram()
+        with self.lock:
+            total.merge(self.base)
+            shards = list(self.shards)
+        for hist in shards:
+            total.merge(hist)
+        return total
+
+    def clear(self):
+        with self.lock:
+            self.base.clear()
+            for hist in self.shards:
+                hist.clear()
+
+
+class TimingRegistry:
+    """Collects per-function latencies and exports them as JSON or Prometheus text."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _metric(self, name):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = _Metric()
+            return metric
+
+    def timer(self, func=None, *, name=None):
+        """
+        Decorator recording the wall time of every call, including failures.
+
+        For `async def` functions this is the awaited time, from the call
+        until the result is available.
+        """
+        def decorator(f):
+            metric = self._metric(name or f"{f.__module__}.{f.__qualname__}")
+            local = metric.local
+            kind = async_support.function_kind(f)
+
+            def record(elapsed):
+                try:
+                    hist = local.hist
+                except AttributeError:
+                    hist = metric.shard()
+                hist.record(elapsed)
+
+            if kind == async_support.COROUTINE:
+                # Timed around the await, so time spent suspended counts too.
+                @wraps(f)
+                async def async_wrapper(*args, **kwargs):
+                    start = perf_counter_ns()
+                    try:
+                        return await f(*args, **kwargs)
+                    finally:
+                        record(perf_counter_ns() - start)
+                return async_wrapper
+
+            if kind == async_support.ASYNC_GENERATOR:
+                # From the first item requested until exhaustion or close.
+                @wraps(f)
+                async def agen_wrapper(*args, **kwargs):
+                    start = perf_counter_ns()
+                    try:
+                        async for item in f(*args, **kwargs):
+                            yield item
+                    finally:
+                        record(perf_counter_ns() - start)
+                return agen_wrapper
+
+            # Histogram.record() inlined on the shard's list: this is the
+            # path every timed call takes.
+            @wraps(f)
+            def wrapper(*args, **kwargs):
+                start = perf_counter_ns()
+                try:
+                    return f(*args, **kwargs)
+                finally:
+                    ns = perf_counter_ns() - start
+                    try:
+                        counts = local.counts
+                    except AttributeError:
+                        counts = metric.shard().counts
+                    if ns < _LINEAR:
+                        counts[ns] += 1
+                    else:
+                        shift = ns.bit_length() - SUB_BITS
+                        counts[shift * _HALF + (ns >> shift)] += 1
+                    counts[TOTAL] += ns
+
+            return wrapper
+
+        if func is None:
+            return decorator
+        return decorator(func)
+
+    @contextmanager
+    def time(self, name):
+        """Time a block of code: `with registry.time("parse"): ...`"""
+        metric = self._metric(name)
+        start = perf_counter_ns()
+        try:
+            yield
+        finally:
+            elapsed = perf_counter_ns() - start
+            try:
+                hist = metric.local.hist
+            except AttributeError:
+                hist = metric.shard()
+            hist.record(elapsed)
+
+    def snapshot(self, reset=False):
+        """
+        Return {name: TimingStats} for every metric.
+
+        With reset=True the histograms are cleared after reading. Calls that
+        finish while the reset is in progress may be dropped.
+        """
+        with self._lock:
+            metrics = dict(self._metrics)
+        result = {}
+        for name, metric in sorted(metrics.items()):
+            result[name] = metric.merged().stats()
+            if reset:
+                metric.clear()
+        return result
+
+    def reset(self):
+        self.snapshot(reset=True)
+
+    def to_json(self, reset=False, **dumps_kwargs):
+        snap = self.snapshot(reset)
+        return json.dumps({name: s._asdict() for name, s in snap.items()}, **dumps_kwargs)
+
+    def to_prometheus(self, metric="function_duration_seconds", reset=False):
+        """Render a snapshot in the Prometheus text exposition format."""
+        lines = [
+            f"# HELP {metric} Wall time of instrumented function calls.",
+            f"# TYPE {metric} summary",
+        ]
+        for name, s in self.snapshot(reset).items():
+            label = name.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+            for q, ns in (("0.5", s.p50_ns), ("0.9", s.p90_ns), ("0.99", s.p99_ns)):
+                lines.append(f'{metric}{{function="{label}",quantile="{q}"}} {ns / 1e9!r}')
+            lines.append(f'{metric}_sum{{function="{label}"}} {s.total_ns / 1e9!r}')
+            lines.append(f'{metric}_count{{function="{label}"}} {s.count}')
+        return "\n".join(lines) + "\n"
+
+
+# A process-wide default, so `@timer` works like the tutorial version.
+REGISTRY = TimingRegistry()
+timer = REGISTRY.timer
+
+
+if __name__ == "__main__":
+    import random
+    import time
+
+    print("=" * 60)
+    print("1. DECORATING FUNCTIONS")
+    print("=" * 60)
+
+    @timer
+    def fast_function(x):
+        return x * 2
+
+    @timer
+    def jittery_function():
+        time.sleep(random.choice([0.001, 0.001, 0.001, 0.005]))
+
+    for i in range(100_000):
+        fast_function(i)
+    for _ in range(50):
+        jittery_function()
+
+    for name, s in REGISTRY.snapshot().items():
+        print(f"{name}")
+        print(f"  count={s.count} mean={s.mean_ns}ns p50={s.p50_ns}ns "
+              f"p90={s.p90_ns}ns p99={s.p99_ns}ns max={s.max_ns}ns")
+
+    print("\n" + "=" * 60)
+    print("2. OVERHEAD PER CALL")
+    print("=" * 60)
+
+    def bare(x):
+        return x * 2
+
+    def clock_reads(x):
+        perf_counter_ns()
+        perf_counter_ns()
+        return x * 2
+
+    timed = TimingRegistry().timer(bare)
+    n = 200_000
+    for label, fn in (("undecorated", bare), ("2 clock reads", clock_reads),
+                      ("registry timer", timed)):
+        start = perf_counter_ns()
+        for i in range(n):
+            fn(i)
+        print(f"{label:15} {(perf_counter_ns() - start) / n:7.1f} ns/call")
+
+    print("\n" + "=" * 60)
+    print("3. THREADS AND BLOCKS")
+    print("=" * 60)
+
+    registry = TimingRegistry()
+
+    def worker():
+        for _ in range(10_000):
+            with registry.time("block"):
+                sum(range(10))
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    print(f"4 threads x 10000 -> count = {registry.snapshot()['block'].count}")
+
+    print("\n" + "=" * 60)
+    print("4. EXPORT AND RESET")
+    print("=" * 60)
+
+    print(registry.to_json(indent=2))
+    print(registry.to_prometheus(reset=True), end="")
+    print(f"after reset: {registry.snapshot()['block']}")
@@ -0,0 +1,273 @@
+#* Asynchronous, lazily-formatted call logging
+# log_function_call in 01_Basic/07_decorators.py builds two f-strings on every
+# call and writes them synchronously, even when INFO is switched off:
+#
+#     logging.info(f"Calling {func.__name__} with args={args}, kwargs={kwargs}")
+#
+# The f-string is evaluated *before* logging gets a chance to drop the record.
+# This version:
+#   1. checks logger.isEnabledFor(level) first and does nothing else if off
+#   2. passes %-style arguments, so repr() only runs when a handler formats
+#   3. truncates argument reprs with reprlib, so huge inputs stay cheap
+#   4. optionally logs only 1 call in N (sampling)
+#   5. hands records to a QueueListener thread, so the caller never waits on
+#      a file, socket or terminal
+#   6. logs `async def` results after the await (19_async_decorators.py)
+
+import importlib
+import itertools
+import logging
+import logging.handlers
+import queue
+import reprlib
+import threading
+from functools import wraps
+
+async_support = importlib.import_module("19_async_decorators")
+
+
+class LazyRepr:
+    """Defers a bounded repr() of obj until the record is actually formatted."""
+
+    __slots__ = ("obj", "limit")
+
+    def __init__(self, obj, limit):
+        self.obj = obj
+        self.limit = limit
+
+    def __str__(self):
+        short = reprlib.Repr()
+        short.maxstring = short.maxother = self.limit
+        text = short.repr(self.obj)
+        if len(text) > self.limit:
+            text = text[:self.limit - 3] + "..."
+        return text
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that never blocks and never formats in the caller's thread.
+
+    The stock QueueHandler.prepare() renders the message before enqueueing;
+    here the record is enqueued as-is and the listener thread formats it.
+    Argument objects are therefore formatted a moment after the call returns,
+    so mutating an argument in place right after the call can show up in
+    the log. When the queue is full, records are dropped and counted.
+    """
+
+    def __init__(self, q):
+        super().__init__(q)
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _BlockingStopListener(logging.handlers.QueueListener):
+    # The stop sentinel must wait for room: dropping it would hang stop().
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+
+class AsyncLogging:
+    """
+    Route a logger through a bounded queue to a background listener thread.
+
+    Args:
+        *handlers: The real handlers (file, stream, ...) run by the listener
+        logger (logging.Logger | None): Logger to attach to, root by default
+        maxsize (int): Queue capacity; records beyond it are dropped
+
+    Use as a context manager, or call start() and stop() yourself. stop()
+    flushes every queued record before returning.
+    """
+
+    def __init__(self, *handlers, logger=None, maxsize=10_000):
+        self.logger = logger if logger is not None else logging.getLogger()
+        self.queue = queue.Queue(maxsize)
+        self.handler = DroppingQueueHandler(self.queue)
+        self.listener = _BlockingStopListener(
+            self.queue, *handlers, respect_handler_level=True
+        )
+
+    @property
+    def dropped(self):
+        return self.handler.dropped
+
+    def start(self):
+        self.logger.addHandler(self.handler)
+        self.listener.start()
+        return self
+
+    def stop(self):
+        self.logger.removeHandler(self.handler)
+        self.listener.stop()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def log_function_call(func=None, *, logger=None, level=logging.INFO, sample=1,
+                      max_arg_len=200):
+    """
+    Log each call and its result without paying for it when logging is off.
+
+    Args:
+        logger (logging.Logger | None): Destination, the root logger by default
+        level (int): Level of both records
+        sample (int): Log only one call in every `sample` calls
+        max_arg_len (int): Longest repr written for args, kwargs or result
+    """
+    def decorator(f):
+        log = logger if logger is not None else logging.getLogger()
+        name = f.__qualname__
+        counter = itertools.count()
+        kind = async_support.function_kind(f)
+
+        # Shared by every wrapper below. isEnabledFor() is cached by the
+        # logging module, so a disabled level costs one dict lookup and no
+        # string work at all.
+        def enabled():
+            return log.isEnabledFor(level) and not (sample > 1 and next(counter) % sample)
+
+        def log_call(args, kwargs):
+            log.log(level, "Calling %s with args=%s, kwargs=%s", name,
+                    LazyRepr(args, max_arg_len), LazyRepr(dict(kwargs), max_arg_len))
+
+        def log_result(result):
+            log.log(level, "%s returned %s", name, LazyRepr(result, max_arg_len))
+
+        if kind == async_support.COROUTINE:
+            @wraps(f)
+            async def async_wrapper(*args, **kwargs):
+                if not enabled():
+                    return await f(*args, **kwargs)
+                log_call(args, kwargs)
+                result = await f(*args, **kwargs)
+                log_result(result)
+                return result
+            return async_wrapper
+
+        if kind == async_support.ASYNC_GENERATOR:
+            @wraps(f)
+            async def agen_wrapper(*args, **kwargs):
+                if not enabled():
+                    async for item in f(*args, **kwargs):
+                        yield item
+                    return
+                log_call(args, kwargs)
+                count = 0
+                async for item in f(*args, **kwargs):
+                    count += 1
+                    yield item
+                log.log(level, "%s finished after %d items", name, count)
+            return agen_wrapper
+
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            if not enabled():
+                return f(*args, **kwargs)
+            log_call(args, kwargs)
+            result = f(*args, **kwargs)
+            log_result(result)
+            return result
+
+        return wrapper
+
+    if func is None:
+        return decorator
+    return decorator(func)
+
+
+if __name__ == "__main__":
+    import io
+    import time
+
+    print("=" * 60)
+    print("1. BACKGROUND WRITES")
+    print("=" * 60)
+
+    log = logging.getLogger("demo")
+    log.setLevel(logging.INFO)
+    log.propagate = False
+    stream = logging.StreamHandler()
+    stream.setFormatter(logging.Formatter("%(levelname)s:%(name)s:%(message)s"))
+
+    @log_function_call(logger=log)
+    def add(a, b):
+        return a + b
+
+    with AsyncLogging(stream, logger=log):
+        add(3, 5)
+        add(a=1, b=2)
+    # INFO:demo:Calling add with args=(3, 5), kwargs={}
+    # INFO:demo:add returned 8
+    # ...
+
+    print("\n" + "=" * 60)
+    print("2. TRUNCATION AND SAMPLING")
+    print("=" * 60)
+
+    @log_function_call(logger=log, sample=1000, max_arg_len=40)
+    def total(values):
+        return sum(values)
+
+    with AsyncLogging(stream, logger=log):
+        for _ in range(3000):
+            total(list(range(10_000)))          # logged 3 times, 40 chars each
+
+    print("\n" + "=" * 60)
+    print("3. COST WHEN THE LEVEL IS OFF")
+    print("=" * 60)
+
+    def original_log_function_call(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            logging.info(f"Calling {func.__name__} with args={args}, kwargs={kwargs}")
+            result = func(*args, **kwargs)
+            logging.info(f"{func.__name__} returned {result}")
+            return result
+        return wrapper
+
+    logging.getLogger().setLevel(logging.WARNING)
+    quiet = logging.getLogger("quiet")
+    payload = list(range(1000))
+    candidates = [
+        ("original", original_log_function_call(len)),
+        ("lazy", log_function_call(len, logger=quiet)),
+    ]
+    n = 20_000
+    for label, fn in candidates:
+        start = time.perf_counter()
+        for _ in range(n):
+            fn(payload)
+        print(f"{label:8} {(time.perf_counter() - start) / n * 1e6:8.2f} us/call")
+
+    print("\n" + "=" * 60)
+    print("4. A FULL QUEUE DROPS INSTEAD OF BLOCKING")
+    print("=" * 60)
+
+    class SlowHandler(logging.StreamHandler):
+        def emit(self, record):
+            time.sleep(0.01)
+            super().emit(record)
+
+    log.setLevel(logging.INFO)
+    sink = SlowHandler(io.StringIO())
+    background = AsyncLogging(sink, logger=log, maxsize=10)
+    with background:
+        start = time.perf_counter()
+        for i in range(1000):
+            add(i, i)
+        elapsed = time.perf_counter() - start
+    print(f"2000 records in {elapsed * 1000:.1f} ms of caller time, "
+          f"{background.dropped} dropped, {threading.active_count()} thread(s) left")
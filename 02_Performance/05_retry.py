@@ -0,0 +1,357 @@
+#* Non-blocking retry with backoff, jitter, budgets and a circuit breaker
+# The retry factory in 01_Basic/07_decorators.py sleeps a fixed delay with
+# time.sleep(). Wrapped around an `async def`, that freezes the whole event
+# loop; and when a dependency is struggling, every client retrying on the
+# same schedule multiplies its load. This version:
+#   - detects coroutine functions and awaits asyncio.sleep() instead; async
+#     generators are retried only until their first item
+#   - backs off exponentially with "full jitter": sleep a random amount in
+#     [0, delay * backoff**attempt], which spreads clients out
+#   - only retries the exception types you list
+#   - can share a RetryBudget, capping retries at a fraction of real calls
+#   - can share a CircuitBreaker, which fails fast while a dependency is down
+
+import asyncio
+import importlib
+import random
+import threading
+import time
+from functools import wraps
+
+async_support = importlib.import_module("19_async_decorators")
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a dependency whose circuit is open."""
+
+
+class RetryBudget:
+    """
+    Token bucket that limits retries to a fraction of first attempts.
+
+    Args:
+        ratio (float): Tokens earned per first attempt (0.1 = retries may add
+            at most 10% extra load)
+        min_per_second (float): Tokens earned per second regardless of
+            traffic, so low-volume callers can still retry
+        max_tokens (float): Bucket capacity
+    """
+
+    def __init__(self, ratio=0.1, min_per_second=1.0, max_tokens=10.0, clock=time.monotonic):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self._clock = clock
+        self._tokens = max_tokens
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, amount):
+        now = self._clock()
+        self._tokens = min(
+            self.max_tokens,
+            self._tokens + amount + (now - self._updated) * self.min_per_second,
+        )
+        self._updated = now
+
+    def deposit(self):
+        with self._lock:
+            self._refill(self.ratio)
+
+    def withdraw(self):
+        """Take one token for a retry; False means the budget is spent."""
+        with self._lock:
+            self._refill(0.0)
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return True
+            return False
+
+
+class CircuitBreaker:
+    """
+    Stop calling a dependency after repeated failures.
+
+    closed    -> calls pass through; failure_threshold consecutive failures
+                 open the circuit
+    open      -> calls fail with CircuitOpenError for reset_timeout seconds
+    half-open -> one trial call is let through; success closes the circuit,
+                 failure opens it again
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == self.OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def before_call(self):
+        with self._lock:
+            if self._state == self.OPEN:
+                if self._clock() - self._opened_at < self.reset_timeout:
+                    raise CircuitOpenError("Circuit open; dependency is failing")
+                self._state = self.HALF_OPEN
+            if self._state == self.HALF_OPEN:
+                if self._trial_running:
+                    raise CircuitOpenError("Circuit half-open; trial call in progress")
+                self._trial_running = True
+
+    def on_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_running = False
+
+    def on_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_running = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+
+    def on_ignored(self):
+        """The call raised an error that says nothing about dependency health."""
+        with self._lock:
+            self._trial_running = False
+
+
+def backoff_delay(attempt, delay, backoff, max_delay, jitter):
+    """Seconds to wait after the given (0-based) failed attempt."""
+    ceiling = min(max_delay, delay * backoff ** attempt)
+    return random.uniform(0, ceiling) if jitter else ceiling
+
+
+def retry(max_attempts=3, delay=1, *, backoff=2.0, max_delay=30.0, jitter=True,
+          retry_on=(Exception,), budget=None, breaker=None):
+    """
+    Retry a sync or async function (or async generator) on failure.
+
+    Args:
+        max_attempts (int): Total attempts including the first one
+        delay (float): Base delay in seconds before the first retry
+        backoff (float): Multiplier applied per attempt (1 = fixed delay)
+        max_delay (float): Upper bound for a single delay
+        jitter (bool): Use full jitter instead of the exact delay
+        retry_on (tuple): Exception types that may be retried; anything else
+            propagates immediately
+        budget (RetryBudget | None): Shared limit on retries
+        breaker (CircuitBreaker | None): Shared circuit breaker
+    """
+    def plan(attempt, error):
+        """Record a failure and return the delay before the next attempt, or None."""
+        retryable = isinstance(error, retry_on)
+        if breaker is not None:
+            breaker.on_failure() if retryable else breaker.on_ignored()
+        if not retryable or attempt == max_attempts - 1:
+            return None
+        if budget is not None and not budget.withdraw():
+            return None
+        return backoff_delay(attempt, delay, backoff, max_delay, jitter)
+
+    def decorator(func):
+        kind = async_support.function_kind(func)
+        if kind == async_support.ASYNC_GENERATOR:
+            # Once an item has reached the caller, starting over would repeat
+            # it, so only failures before the first item are retried.
+            @wraps(func)
+            async def agen_wrapper(*args, **kwargs):
+                if budget is not None:
+                    budget.deposit()
+                for attempt in range(max_attempts):
+                    if breaker is not None:
+                        breaker.before_call()
+                    started = False
+                    try:
+                        async for item in func(*args, **kwargs):
+                            started = True
+                            yield item
+                    except Exception as e:
+                        # plan() on the last attempt records the failure and
+                        # never asks for another one.
+                        wait = plan(max_attempts - 1 if started else attempt, e)
+                        if wait is None:
+                            raise
+                        await asyncio.sleep(wait)
+                    except BaseException:
+                        # Cancelled, or the consumer stopped early (GeneratorExit):
+                        # the outcome says nothing, but the trial slot must be freed.
+                        if breaker is not None:
+                            breaker.on_ignored()
+                        raise
+                    else:
+                        if breaker is not None:
+                            breaker.on_success()
+                        return
+            return agen_wrapper
+
+        if kind == async_support.COROUTINE:
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if budget is not None:
+                    budget.deposit()
+                for attempt in range(max_attempts):
+                    if breaker is not None:
+                        breaker.before_call()
+                    try:
+                        result = await func(*args, **kwargs)
+                    except Exception as e:
+                        wait = plan(attempt, e)
+                        if wait is None:
+                            raise
+                        await asyncio.sleep(wait)
+                    except BaseException:
+                        if breaker is not None:
+                            breaker.on_ignored()
+                        raise
+                    else:
+                        if breaker is not None:
+                            breaker.on_success()
+                        return result
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if budget is not None:
+                budget.deposit()
+            for attempt in range(max_attempts):
+                if breaker is not None:
+                    breaker.before_call()
+                try:
+                    result = func(*args, **kwargs)
+                except Exception as e:
+                    wait = plan(attempt, e)
+                    if wait is None:
+                        raise
+                    time.sleep(wait)
+                except BaseException:
+                    if breaker is not None:
+                        breaker.on_ignored()
+                    raise
+                else:
+                    if breaker is not None:
+                        breaker.on_success()
+                    return result
+        return wrapper
+    return decorator
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("1. BACKOFF WITH FULL JITTER")
+    print("=" * 60)
+
+    random.seed(1)
+    for attempt in range(5):
+        exact = backoff_delay(attempt, 0.1, 2.0, 1.0, jitter=False)
+        jittered = backoff_delay(attempt, 0.1, 2.0, 1.0, jitter=True)
+        print(f"after attempt {attempt + 1}: ceiling {exact:.2f}s, jittered {jittered:.3f}s")
+
+    print("\n" + "=" * 60)
+    print("2. ONLY RETRYABLE ERRORS ARE RETRIED")
+    print("=" * 60)
+
+    calls = []
+
+    @retry(max_attempts=4, delay=0.01, retry_on=(ConnectionError,))
+    def fetch(kind):
+        calls.append(kind)
+        if kind == "flaky" and len(calls) < 3:
+            raise ConnectionError("reset by peer")
+        if kind == "bad":
+            raise ValueError("malformed request")
+        return "Success!"
+
+    print(f"fetch('flaky') = {fetch('flaky')} after {len(calls)} attempts")
+    calls.clear()
+    try:
+        fetch("bad")
+    except ValueError as e:
+        print(f"fetch('bad') raised {e!r} after {len(calls)} attempt")
+
+    print("\n" + "=" * 60)
+    print("3. ASYNC FUNCTIONS DO NOT BLOCK THE EVENT LOOP")
+    print("=" * 60)
+
+    attempts = {"n": 0}
+
+    @retry(max_attempts=3, delay=0.05, jitter=False)
+    async def unreliable():
+        attempts["n"] += 1
+        if attempts["n"] < 3:
+            raise ConnectionError("try again")
+        return "Success!"
+
+    async def heartbeat(ticks):
+        for _ in range(10):
+            ticks.append(time.perf_counter())
+            await asyncio.sleep(0.01)
+
+    async def main():
+        ticks = []
+        result, _ = await asyncio.gather(unreliable(), heartbeat(ticks))
+        gap = max(b - a for a, b in zip(ticks, ticks[1:]))
+        print(f"unreliable() = {result}; longest heartbeat gap {gap * 1000:.0f} ms")
+
+    asyncio.run(main())
+
+    print("\n" + "=" * 60)
+    print("4. RETRY BUDGET")
+    print("=" * 60)
+
+    budget = RetryBudget(ratio=0.1, min_per_second=0, max_tokens=5)
+    attempts["n"] = 0
+
+    @retry(max_attempts=3, delay=0, budget=budget)
+    def always_down():
+        attempts["n"] += 1
+        raise ConnectionError("down")
+
+    for _ in range(20):
+        try:
+            always_down()
+        except ConnectionError:
+            pass
+    print(f"20 calls x 3 attempts would be 60; budget allowed {attempts['n']}")
+
+    print("\n" + "=" * 60)
+    print("5. CIRCUIT BREAKER")
+    print("=" * 60)
+
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=0.1)
+    attempts["n"] = 0
+    healthy = {"up": False}
+
+    @retry(max_attempts=2, delay=0, breaker=breaker)
+    def backend():
+        attempts["n"] += 1
+        if not healthy["up"]:
+            raise ConnectionError("down")
+        return "Success!"
+
+    outcomes = []
+    for _ in range(5):
+        try:
+            backend()
+        except (ConnectionError, CircuitOpenError) as e:
+            outcomes.append(type(e).__name__)
+    print(f"outcomes: {outcomes}")
+    print(f"backend actually called {attempts['n']} times, state = {breaker.state}")
+
+    time.sleep(0.11)
+    healthy["up"] = True
+    print(f"after reset_timeout: state = {breaker.state}, backend() = {backend()}, "
+          f"state = {breaker.state}")
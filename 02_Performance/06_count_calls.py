@@ -0,0 +1,228 @@
+#* Contention-free call counting
+# CountCalls in 01_Basic/07_decorators.py has three problems:
+#   1. `self.count += 1` is a read-modify-write; two threads can read the same
+#      value and one increment is lost
+#   2. it prints on every call, which costs far more than the call itself
+#   3. it is not a descriptor, so on a method `self` is never bound:
+#
+#        class Greeter:
+#            @CountCalls
+#            def hello(self): ...
+#        Greeter().hello()   # TypeError: missing 1 required positional argument
+#
+# This version gives every thread its own counter (a shard). Only the owning
+# thread ever writes a shard, so increments need no lock and never lose
+# updates; reads add the shards up. When a thread exits, its shard is folded
+# into a running total (as in 03_timing_registry.py), so a pool that keeps
+# replacing its threads does not grow the list of shards. Wrapping an
+# `async def` gives an object whose __call__ is async too (see
+# 19_async_decorators.py).
+
+import functools
+import importlib
+import threading
+import types
+import weakref
+from collections import namedtuple
+
+async_support = importlib.import_module("19_async_decorators")
+
+CallCounts = namedtuple("CallCounts", ["total", "by_thread"])
+CallCounts.__doc__ = """Total calls, and calls per live thread keyed by thread ident."""
+
+
+class _Shard:
+    __slots__ = ("count", "ident")
+
+    def __init__(self, ident):
+        self.count = 0
+        self.ident = ident
+
+
+class _ShardOwner:
+    """Lives in a thread's local storage; goes away when the thread ends."""
+
+    __slots__ = ("__weakref__",)
+
+
+class CountCalls:
+    """Count calls to a function or method from any number of threads."""
+
+    # __dict__ takes what update_wrapper copies besides these: __doc__,
+    # __module__, __annotations__ and the function's own attributes.
+    __slots__ = ("__wrapped__", "__name__", "__qualname__", "__dict__",
+                 "_local", "_shards", "_retired", "_lock")
+
+    def __new__(cls, func):
+        # An `async def` gets a subclass whose __call__ is itself async, so
+        # decorators stacked on top still see a coroutine function.
+        if cls is CountCalls:
+            kind = async_support.function_kind(func)
+            if kind == async_support.COROUTINE:
+                cls = _AsyncCountCalls
+            elif kind == async_support.ASYNC_GENERATOR:
+                cls = _AsyncGenCountCalls
+        return object.__new__(cls)
+
+    def __init__(self, func):
+        functools.update_wrapper(self, func)
+        self._local = threading.local()
+        self._shards = []
+        self._retired = 0                   # calls made by threads that have exited
+        self._lock = threading.Lock()       # only taken when a thread starts or ends
+
+    def _new_shard(self):
+        shard = _Shard(threading.get_ident())
+        owner = _ShardOwner()
+        with self._lock:
+            self._shards.append(shard)
+        weakref.finalize(owner, self._retire, shard)
+        self._local.shard, self._local.owner = shard, owner
+        return shard
+
+    def _retire(self, shard):
+        with self._lock:
+            self._shards.remove(shard)
+            self._retired += shard.count
+
+    def _tick(self):
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._new_shard()
+        shard.count += 1
+
+    def __call__(self, *args, **kwargs):
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._new_shard()
+        shard.count += 1
+        return self.__wrapped__(*args, **kwargs)
+
+    def __get__(self, instance, owner=None):
+        # Behave like a plain function: accessed through an instance, return
+        # a bound method so `self` is passed along.
+        if instance is None:
+            return self
+        return types.MethodType(self, instance)
+
+    @property
+    def count(self):
+        return self.snapshot().total
+
+    def snapshot(self):
+        """
+        Return the total and a breakdown by thread ident, read in one pass.
+
+        Threads that have exited only count towards the total.
+        """
+        with self._lock:
+            shards = list(self._shards)
+            retired = self._retired
+        by_thread = {}
+        for shard in shards:
+            by_thread[shard.ident] = by_thread.get(shard.ident, 0) + shard.count
+        return CallCounts(retired + sum(by_thread.values()), by_thread)
+
+    def reset(self):
+        """Zero all counters. Calls racing with the reset may be dropped."""
+        with self._lock:
+            self._retired = 0
+            for shard in self._shards:
+                shard.count = 0
+
+    def __repr__(self):
+        return f"<CountCalls {self.__qualname__}: {self.count} calls>"
+
+
+class _AsyncCountCalls(CountCalls):
+    __slots__ = ()
+
+    async def __call__(self, *args, **kwargs):
+        self._tick()
+        return await self.__wrapped__(*args, **kwargs)
+
+
+class _AsyncGenCountCalls(CountCalls):
+    __slots__ = ()
+
+    async def __call__(self, *args, **kwargs):
+        self._tick()
+        async for item in self.__wrapped__(*args, **kwargs):
+            yield item
+
+
+if __name__ == "__main__":
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    print("=" * 60)
+    print("1. BASIC USAGE")
+    print("=" * 60)
+
+    @CountCalls
+    def say_hello():
+        return "Hello!"
+
+    say_hello()
+    say_hello()
+    say_hello()
+    print(f"say_hello.count = {say_hello.count}")
+    print(f"say_hello.__name__ = {say_hello.__name__}")
+
+    print("\n" + "=" * 60)
+    print("2. METHODS BIND self")
+    print("=" * 60)
+
+    class Greeter:
+        def __init__(self, name):
+            self.name = name
+
+        @CountCalls
+        def hello(self):
+            return f"Hello from {self.name}"
+
+    print(Greeter("Alice").hello())
+    print(Greeter("Bob").hello())
+    print(f"Greeter.hello = {Greeter.hello!r}")
+
+    print("\n" + "=" * 60)
+    print("3. NO LOST UPDATES UNDER THREADS")
+    print("=" * 60)
+
+    class NaiveCountCalls:
+        def __init__(self, func):
+            self.func = func
+            self.count = 0
+
+        def __call__(self, *args, **kwargs):
+            count = self.count          # the same race as `self.count += 1`,
+            time.sleep(0)               # made visible by yielding the GIL
+            self.count = count + 1
+            return self.func(*args, **kwargs)
+
+    naive = NaiveCountCalls(len)
+    sharded = CountCalls(len)
+
+    def hammer(counter):
+        for _ in range(2_000):
+            counter("x")
+
+    for counter in (naive, sharded):
+        with ThreadPoolExecutor(max_workers=8, thread_name_prefix="worker") as pool:
+            for _ in range(8):
+                pool.submit(hammer, counter)
+        print(f"{type(counter).__name__:15} expected 16000, got {counter.count}")
+
+    # The pool's threads have exited, so their shards are folded into the total.
+    print(f"\nafter the pool shut down: {sharded.snapshot()}")
+
+    churned = CountCalls(len)
+    for _ in range(500):                # short-lived threads, one call each
+        t = threading.Thread(target=churned, args=("x",), name="worker")
+        t.start()
+        t.join()
+    assert churned.count == 500 and not churned._shards
+    print(f"500 short-lived threads -> count {churned.count}, "
+          f"{len(churned._shards)} shards kept")
@@ -0,0 +1,194 @@
+#* Thread-safe singleton with a lock-free fast path
+# The singleton decorator in 01_Basic/07_decorators.py replaces the class with
+# a function:
+#
+#     def get_instance(*args, **kwargs):
+#         if cls not in instances:                      # two threads can both
+#             instances[cls] = cls(*args, **kwargs)     # get here -> two objects
+#         return instances[cls]
+#
+# so `Database` is no longer a class (isinstance(db, Database) raises
+# TypeError), construction can race, and every access pays a Python call and
+# a dict lookup.
+#
+# This version keeps the class itself and patches it in place:
+#   - the first construction runs under a lock (double-checked)
+#   - afterwards __new__ becomes a tiny function returning the instance and
+#     __init__ becomes object.__init__ (a C no-op), so no lock is ever taken
+#     again and the instance's __init__ never re-runs
+#   - Cls() still goes through type.__call__, which costs about as much as
+#     the original wrapper; `Cls.instance` is a class attribute holding the
+#     object once it exists, so hot code can skip that machinery entirely
+#     with a single attribute load (it constructs the instance on first use)
+#   - per_process=True forgets the instance in a forked child, so things like
+#     sockets and connections are rebuilt instead of shared across processes
+#
+# Subclasses of a singleton class share its instance; don't subclass them.
+
+import os
+import threading
+
+
+class _LazyInstance:
+    """Placeholder for Cls.instance until the first construction."""
+
+    def __get__(self, obj, owner):
+        return owner()      # constructing replaces this descriptor
+
+
+def singleton(cls=None, *, per_process=False, eager=False):
+    """
+    Make cls construct at most one instance.
+
+    Args:
+        per_process (bool): Construct a fresh instance in each forked child
+        eager (bool): Construct the instance right away (with no arguments)
+            instead of on first use
+    """
+    def decorate(cls):
+        if "instance" in cls.__dict__:
+            raise TypeError(f"{cls.__name__} already defines 'instance'")
+        original_new = cls.__new__
+        original_init = cls.__dict__.get("__init__")
+        state = {"lock": threading.Lock(), "instance": None}
+
+        def first_new(klass, *args, **kwargs):
+            with state["lock"]:
+                if state["instance"] is None:
+                    if original_new is object.__new__:
+                        instance = original_new(klass)
+                    else:
+                        instance = original_new(klass, *args, **kwargs)
+                    instance.__init__(*args, **kwargs)
+                    state["instance"] = instance
+                    install_fast_path(instance)
+                return state["instance"]
+
+        def install_fast_path(instance):
+            # type.__call__ looks up __init__ again after __new__ returns, so
+            # the no-op is already in place for this very first call.
+            cls.__new__ = staticmethod(lambda klass, *args, **kwargs: instance)
+            cls.__init__ = object.__init__
+            cls.instance = instance
+
+        def install_slow_path():
+            cls.__new__ = staticmethod(first_new)
+            cls.instance = _LazyInstance()
+            if original_init is not None:
+                cls.__init__ = original_init
+            elif "__init__" in cls.__dict__:
+                del cls.__init__
+
+        def forget_in_child():
+            state["lock"] = threading.Lock()    # may have been held at fork
+            state["instance"] = None
+            install_slow_path()
+
+        install_slow_path()
+        if per_process and hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=forget_in_child)
+        if eager:
+            cls()
+        return cls
+
+    if cls is None:
+        return decorate
+    return decorate(cls)
+
+
+if __name__ == "__main__":
+    import time
+    import timeit
+    from functools import wraps
+
+    def original_singleton(cls):
+        instances = {}
+        @wraps(cls)
+        def get_instance(*args, **kwargs):
+            if cls not in instances:
+                instances[cls] = cls(*args, **kwargs)
+            return instances[cls]
+        return get_instance
+
+    print("=" * 60)
+    print("1. CONSTRUCTION RACE")
+    print("=" * 60)
+
+    for decorate in (original_singleton, singleton):
+        inits = []
+
+        @decorate
+        class Database:
+            def __init__(self):
+                time.sleep(0.01)                # a slow connect
+                inits.append(self)
+
+        threads = [threading.Thread(target=Database) for _ in range(10)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        print(f"{decorate.__name__:18} Database initialized {len(inits)} time(s)")
+
+    print("\n" + "=" * 60)
+    print("2. isinstance AND __init__ RUN ONCE")
+    print("=" * 60)
+
+    @singleton
+    class Config:
+        def __init__(self, env="dev"):
+            print(f"  Config initialized for {env}")
+            self.env = env
+
+    c1 = Config("prod")
+    c2 = Config("staging")                      # ignored, like the original
+    print(f"c1 is c2 = {c1 is c2}, env = {c2.env}")
+    print(f"isinstance(c1, Config) = {isinstance(c1, Config)}")
+    try:
+        isinstance(c1, original_singleton(Config))
+    except TypeError as e:
+        print(f"with the original decorator: TypeError: {e}")
+
+    print("\n" + "=" * 60)
+    print("3. COST PER ACCESS")
+    print("=" * 60)
+
+    class Plain:
+        pass
+
+    Old = original_singleton(type("Old", (), {}))
+    New = singleton(type("New", (), {}))
+    candidates = [
+        ("plain class()", "Plain()"),
+        ("original()", "Old()"),
+        ("New()", "New()"),
+        ("New.instance", "New.instance"),
+    ]
+    New()
+    for label, stmt in candidates:
+        best = min(timeit.repeat(stmt, number=200_000, repeat=5, globals=globals()))
+        print(f"{label:14} {best / 200_000 * 1e9:6.1f} ns/access")
+
+    print("\n" + "=" * 60)
+    print("4. PER-PROCESS MODE")
+    print("=" * 60)
+
+    @singleton(per_process=True, eager=True)
+    class Connection:
+        def __init__(self):
+            self.pid = os.getpid()
+
+    parent = Connection()
+    if hasattr(os, "fork"):
+        read_end, write_end = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            child = Connection()
+            os.write(write_end, f"{child.pid} {child is parent}".encode())
+            os._exit(0)
+        os.waitpid(pid, 0)
+        child_pid, same = os.read(read_end, 100).decode().split()
+        print(f"parent instance pid={parent.pid}; child got pid={child_pid}, "
+              f"shared with parent: {same}")
+    else:
+        print("os.fork is not available on this platform")
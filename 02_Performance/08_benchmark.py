@@ -0,0 +1,384 @@
+#* A micro-benchmark harness grown out of `repeat`
+# repeat(times) in 01_Basic/07_decorators.py calls a function N times and
+# keeps the last result. Timing that loop once tells you very little: the
+# first calls warm caches, the garbage collector fires at random moments,
+# and a single number hides how noisy it was. This harness:
+#   - runs warmup calls first
+#   - auto-calibrates how many calls go into one timed sample (like timeit),
+#     so each sample is long enough for the clock to be accurate
+#   - optionally disables the garbage collector while timing
+#   - collects many samples, rejects outliers with Tukey's fences (1.5 IQR)
+#     and reports mean, stdev, min, max and percentiles
+#   - compares two implementations with Welch's t-test
+#   - saves results as JSON, so runs from different commits can be diffed:
+#
+#       python 08_benchmark.py compare before.json after.json
+#
+# Other lessons in this folder use it through
+# importlib.import_module("08_benchmark").
+
+import gc
+import itertools
+import json
+import math
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from collections import namedtuple
+from dataclasses import asdict, dataclass, field
+from functools import wraps
+
+
+@dataclass
+class BenchmarkResult:
+    """Per-call timings in seconds, after outlier rejection."""
+
+    name: str
+    number: int                 # calls per sample
+    samples: list = field(repr=False)
+    outliers: int
+    mean: float
+    stdev: float
+    min: float
+    max: float
+    p50: float
+    p90: float
+    p99: float
+
+    def to_dict(self):
+        return asdict(self)
+
+    def __str__(self):
+        return (f"{self.name}: {format_time(self.mean)} +- {format_time(self.stdev)} "
+                f"(min {format_time(self.min)}, p50 {format_time(self.p50)}, "
+                f"p99 {format_time(self.p99)}; {len(self.samples)} samples x "
+                f"{self.number} calls, {self.outliers} outliers dropped)")
+
+
+Comparison = namedtuple("Comparison", ["baseline", "candidate", "ratio", "t", "dof",
+                                       "p_value", "significant"])
+
+
+def format_time(seconds):
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.3g} {unit}"
+    return f"{seconds / 1e-9:.3g} ns"
+
+
+# ---------------------------------------------------------------------------
+# Statistics
+# ---------------------------------------------------------------------------
+
+def percentile(sorted_values, q):
+    """Linear-interpolated q-th percentile (0-100) of an already sorted list."""
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    pos = (len(sorted_values) - 1) * q / 100
+    low = math.floor(pos)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (pos - low)
+
+
+def reject_outliers(values):
+    """Split values into (kept, dropped) using Tukey's fences."""
+    if len(values) < 4:
+        return list(values), []
+    ordered = sorted(values)
+    q1, q3 = percentile(ordered, 25), percentile(ordered, 75)
+    spread = 1.5 * (q3 - q1)
+    low, high = q1 - spread, q3 + spread
+    kept = [v for v in values if low <= v <= high]
+    return kept, [v for v in values if not low <= v <= high]
+
+
+def _betacf(a, b, x):
+    # Continued fraction for the incomplete beta function (modified Lentz).
+    tiny = 1e-300
+    c, d = 1.0, 1.0 - (a + b) * x / (a + 1)
+    d = 1.0 / (d if abs(d) > tiny else tiny)
+    h = d
+    for m in range(1, 300):
+        for num in (m * (b - m) * x / ((a + 2 * m - 1) * (a + 2 * m)),
+                    -(a + m) * (a + b + m) * x / ((a + 2 * m) * (a + 2 * m + 1))):
+            d = 1.0 + num * d
+            d = 1.0 / (d if abs(d) > tiny else tiny)
+            c = 1.0 + num / c
+            c = c if abs(c) > tiny else tiny
+            h *= d * c
+        if abs(d * c - 1.0) < 1e-12:
+            break
+    return h
+
+
+def betainc(a, b, x):
+    """Regularized incomplete beta function I_x(a, b)."""
+    if x <= 0:
+        return 0.0
+    if x >= 1:
+        return 1.0
+    front = math.exp(math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b)
+                     + a * math.log(x) + b * math.log1p(-x))
+    if x < (a + 1) / (a + b + 2):
+        return front * _betacf(a, b, x) / a
+    return 1.0 - front * _betacf(b, a, 1 - x) / b
+
+
+def welch_t_test(xs, ys):
+    """Return (t, degrees of freedom, two-sided p-value) for two samples."""
+    nx, ny = len(xs), len(ys)
+    if nx < 2 or ny < 2:
+        raise ValueError(f"Welch's t-test needs at least 2 samples on each side, "
+                         f"got {nx} and {ny}")
+    vx, vy = statistics.variance(xs) / nx, statistics.variance(ys) / ny
+    if vx + vy == 0:
+        same = statistics.fmean(xs) == statistics.fmean(ys)
+        return 0.0 if same else math.inf, float(nx + ny - 2), 1.0 if same else 0.0
+    t = (statistics.fmean(ys) - statistics.fmean(xs)) / math.sqrt(vx + vy)
+    dof = (vx + vy) ** 2 / (vx ** 2 / (nx - 1) + vy ** 2 / (ny - 1))
+    return t, dof, betainc(dof / 2, 0.5, dof / (dof + t * t))
+
+
+# ---------------------------------------------------------------------------
+# Measuring
+# ---------------------------------------------------------------------------
+
+def _time_loop(func, args, kwargs, number):
+    loop = itertools.repeat(None, number)
+    start = time.perf_counter()
+    for _ in loop:
+        func(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def calibrate(func, args=(), kwargs=None, min_time=0.02):
+    """Find a call count per sample whose run takes at least min_time seconds."""
+    kwargs = kwargs or {}
+    number = 1
+    while True:
+        elapsed = _time_loop(func, args, kwargs, number)
+        if elapsed >= min_time:
+            return number
+        # Aim a little past min_time, but never grow by more than 10x a step.
+        number = max(number + 1, min(number * 10, int(number * min_time * 1.2 / max(elapsed, 1e-9))))
+
+
+def measure(func, *args, kwargs=None, name=None, warmup=3, repeat=30, number=None,
+            min_time=0.02, disable_gc=True):
+    """
+    Benchmark func(*args, **kwargs).
+
+    Args:
+        kwargs (dict | None): Keyword arguments for func, kept apart from the
+            options below so a function taking e.g. `number=` can be measured
+        name (str | None): Label for reports, the function's name by default
+        warmup (int): Untimed calls made before anything is measured
+        repeat (int): Number of timed samples
+        number (int | None): Calls per sample; calibrated when None
+        min_time (float): Target duration of one sample when calibrating
+        disable_gc (bool): Keep the garbage collector off while timing
+
+    Returns:
+        BenchmarkResult with per-call times (the loop overhead is included,
+        identically for every function measured this way).
+    """
+    kwargs = kwargs or {}
+    for _ in range(warmup):
+        func(*args, **kwargs)
+    gc_was_enabled = gc.isenabled()
+    if disable_gc:
+        gc.collect()
+        gc.disable()
+    try:
+        if number is None:
+            number = calibrate(func, args, kwargs, min_time)
+        raw = [_time_loop(func, args, kwargs, number) / number for _ in range(repeat)]
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    samples, dropped = reject_outliers(raw)
+    ordered = sorted(samples)
+    return BenchmarkResult(
+        name=name or getattr(func, "__qualname__", repr(func)),
+        number=number,
+        samples=samples,
+        outliers=len(dropped),
+        mean=statistics.fmean(samples),
+        stdev=statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        min=ordered[0],
+        max=ordered[-1],
+        p50=percentile(ordered, 50),
+        p90=percentile(ordered, 90),
+        p99=percentile(ordered, 99),
+    )
+
+
+def benchmark(func=None, **options):
+    """
+    Decorator form of measure(): the function behaves as before, and
+    func.benchmark(*args, **kwargs) returns a BenchmarkResult.
+    """
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            return f(*args, **kwargs)
+
+        def run(*args, **kwargs):
+            return measure(f, *args, kwargs=kwargs, **options)
+
+        wrapper.benchmark = run
+        return wrapper
+
+    if func is None:
+        return decorator
+    return decorator(func)
+
+
+def compare(baseline, candidate, alpha=0.05):
+    """
+    Compare two BenchmarkResults.
+
+    ratio < 1 means the candidate is faster. The difference is significant
+    when Welch's t-test p-value is below alpha; a result with fewer than two
+    samples (repeat=1) is never significant.
+    """
+    if len(baseline.samples) < 2 or len(candidate.samples) < 2:
+        t, dof, p = math.nan, math.nan, 1.0
+    else:
+        t, dof, p = welch_t_test(baseline.samples, candidate.samples)
+    return Comparison(baseline.name, candidate.name, candidate.mean / baseline.mean,
+                      t, dof, p, p < alpha)
+
+
+def format_comparison(c):
+    verdict = "faster" if c.ratio < 1 else "slower"
+    change = abs(1 - c.ratio) * 100
+    sig = "significant" if c.significant else "not significant"
+    return (f"{c.candidate} is {change:.1f}% {verdict} than {c.baseline} "
+            f"(x{c.ratio:.3f}, p={c.p_value:.3g}, {sig})")
+
+
+# ---------------------------------------------------------------------------
+# Saving and diffing runs
+# ---------------------------------------------------------------------------
+
+def environment():
+    """Describe where the numbers came from."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "python": sys.version.split()[0],
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def save_results(results, path, **extra_meta):
+    """Write BenchmarkResults to a JSON file keyed by name."""
+    payload = {
+        "meta": {**environment(), **extra_meta},
+        "results": {r.name: r.to_dict() for r in results},
+    }
+    with open(path, "w") as f:
+        json.dump(payload, f, indent=2)
+
+
+def load_results(path):
+    """Read a file written by save_results() back into BenchmarkResults."""
+    with open(path) as f:
+        payload = json.load(f)
+    results = {name: BenchmarkResult(**data) for name, data in payload["results"].items()}
+    return payload["meta"], results
+
+
+def diff_results(old, new, threshold=0.05, alpha=0.05):
+    """
+    Compare two {name: BenchmarkResult} maps.
+
+    Returns a list of (name, Comparison, regressed) for the shared names,
+    where regressed means significantly slower by more than threshold.
+    """
+    rows = []
+    for name in sorted(old.keys() & new.keys()):
+        c = compare(old[name], new[name], alpha)
+        rows.append((name, c, c.significant and c.ratio > 1 + threshold))
+    return rows
+
+
+def _compare_files(old_path, new_path, threshold=0.05):
+    old_meta, old = load_results(old_path)
+    new_meta, new = load_results(new_path)
+    print(f"old: {old_path} (commit {old_meta.get('commit')})")
+    print(f"new: {new_path} (commit {new_meta.get('commit')})")
+    rows = diff_results(old, new, threshold)
+    for name, c, regressed in rows:
+        flag = "REGRESSION" if regressed else ""
+        print(f"  {name:40} x{c.ratio:6.3f}  p={c.p_value:<8.3g} {flag}")
+    return 1 if any(regressed for _, _, regressed in rows) else 0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 4 and sys.argv[1] == "compare":
+        threshold = float(sys.argv[4]) if len(sys.argv) > 4 else 0.05
+        sys.exit(_compare_files(sys.argv[2], sys.argv[3], threshold))
+
+    import os
+    import tempfile
+
+    print("=" * 60)
+    print("1. MEASURING A FUNCTION")
+    print("=" * 60)
+
+    @benchmark(repeat=20)
+    def build_list(n):
+        return [i * i for i in range(n)]
+
+    print(f"build_list(5) = {build_list(5)}")      # still a normal function
+    result = build_list.benchmark(1000)
+    print(result)
+
+    print("\n" + "=" * 60)
+    print("2. COMPARING TWO IMPLEMENTATIONS")
+    print("=" * 60)
+
+    def with_map(n):
+        return list(map(lambda i: i * i, range(n)))
+
+    def with_comprehension(n):
+        return [i * i for i in range(n)]
+
+    a = measure(with_map, 1000, repeat=20)
+    b = measure(with_comprehension, 1000, repeat=20)
+    c = measure(with_comprehension, 1000, repeat=20, name="with_comprehension (again)")
+    print(format_comparison(compare(a, b)))
+    print(format_comparison(compare(b, c)))
+    once = measure(with_map, 1000, repeat=1, name="with_map (repeat=1)")
+    assert not compare(once, b).significant
+    print(format_comparison(compare(once, b)))
+    try:
+        welch_t_test([1.0], [1.0, 2.0])
+        raise AssertionError("expected a ValueError")
+    except ValueError as e:
+        print(f"welch_t_test with one sample -> ValueError: {e}")
+
+    print("\n" + "=" * 60)
+    print("3. SAVING AND DIFFING RUNS")
+    print("=" * 60)
+
+    path = os.path.join(tempfile.gettempdir(), "benchmark_demo.json")
+    save_results([a, b], path)
+    meta, loaded = load_results(path)
+    print(f"saved {sorted(loaded)} from commit {meta['commit']} to {path}")
+    # Pretend a later commit swapped the two implementations.
+    later = {"with_map": b, "with_comprehension": a}
+    for name, comparison, regressed in diff_results(loaded, later):
+        print(f"  {name:20} x{comparison.ratio:.3f} regressed={regressed}")
@@ -0,0 +1,260 @@
+#* What does each decorator cost per call?
+# We stack the decorators from 01_Basic/07_decorators.py on hot functions
+# without knowing what they cost. This suite measures the per-call overhead
+# of every pattern there (and of the replacements in this folder, and of a
+# few common stacks) against the same function undecorated.
+#
+# Each decorator is timed with three call shapes:
+#   zero        f()
+#   positional  f(1, 2)
+#   keyword     f(a=1, b=2)
+# A shape a decorator cannot accept (the tutorial memoize takes no keyword
+# arguments, validate_range takes exactly one value) is skipped.
+#
+# The tutorial versions print or log on every call. That output goes to
+# os.devnull here, but its formatting cost is real and is part of what they
+# cost you in production.
+#
+# Usage:
+#   python 09_decorator_overhead.py                       # run and print
+#   python 09_decorator_overhead.py -o results.json       # also save JSON
+#   python 09_decorator_overhead.py --compare old.json    # exit 1 when any
+#                                                         # case regressed
+#   python 09_decorator_overhead.py --quick               # fewer samples
+
+import argparse
+import contextlib
+import importlib
+import logging
+import os
+import sys
+import time
+from functools import wraps
+
+bench = importlib.import_module("08_benchmark")
+
+
+# ---------------------------------------------------------------------------
+# The tutorial decorators, exactly as written in 07_decorators.py
+# ---------------------------------------------------------------------------
+
+def timer(func):
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.time()
+        result = func(*args, **kwargs)
+        end = time.time()
+        print(f"{func.__name__} took {end - start:.4f} seconds")
+        return result
+    return wrapper
+
+
+def log_function_call(func):
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        logging.info(f"Calling {func.__name__} with args={args}, kwargs={kwargs}")
+        result = func(*args, **kwargs)
+        logging.info(f"{func.__name__} returned {result}")
+        return result
+    return wrapper
+
+
+def memoize(func):
+    cache = {}
+    @wraps(func)
+    def wrapper(*args):
+        if args not in cache:
+            cache[args] = func(*args)
+            print(f"Calculating {func.__name__}{args}")
+        else:
+            print(f"Using cached result for {func.__name__}{args}")
+        return cache[args]
+    return wrapper
+
+
+def require_auth(func):
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        authenticated = True
+        if not authenticated:
+            raise PermissionError("Authentication required")
+        return func(*args, **kwargs)
+    return wrapper
+
+
+def retry(max_attempts=3, delay=1):
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            for attempt in range(max_attempts):
+                try:
+                    return func(*args, **kwargs)
+                except Exception as e:
+                    if attempt == max_attempts - 1:
+                        raise
+                    print(f"Attempt {attempt + 1} failed: {e}. Retrying...")
+                    time.sleep(delay)
+        return wrapper
+    return decorator
+
+
+def validate_range(min_val, max_val):
+    def decorator(func):
+        @wraps(func)
+        def wrapper(value):
+            if not min_val <= value <= max_val:
+                raise ValueError(f"Value must be between {min_val} and {max_val}")
+            return func(value)
+        return wrapper
+    return decorator
+
+
+class CountCalls:
+    def __init__(self, func):
+        self.func = func
+        self.count = 0
+
+    def __call__(self, *args, **kwargs):
+        self.count += 1
+        print(f"Call {self.count} of {self.func.__name__}")
+        return self.func(*args, **kwargs)
+
+
+# ---------------------------------------------------------------------------
+# The cases
+# ---------------------------------------------------------------------------
+
+def zero():
+    return None
+
+
+def positional(a, b):
+    return a
+
+
+def keyword(a=0, b=0):
+    return a
+
+
+def one(value):
+    return value
+
+
+SHAPES = {
+    "zero": (zero, (), {}),
+    "positional": (positional, (1, 2), {}),
+    "keyword": (keyword, (), {"a": 1, "b": 2}),
+}
+
+
+def _replacements():
+    """Decorators from this folder that replace the tutorial ones."""
+    memo = importlib.import_module("01_memoize")
+    timing = importlib.import_module("03_timing_registry")
+    quiet_log = importlib.import_module("04_async_logging")
+    retrying = importlib.import_module("05_retry")
+    counting = importlib.import_module("06_count_calls")
+    registry = timing.TimingRegistry()
+    quiet = logging.getLogger("overhead.quiet")
+    quiet.setLevel(logging.WARNING)
+    return {
+        "01_memoize.memoize": memo.memoize,
+        "03_timing_registry.timer": registry.timer,
+        "04_async_logging.log_function_call (off)":
+            lambda f: quiet_log.log_function_call(f, logger=quiet),
+        "05_retry.retry": retrying.retry(max_attempts=3, delay=0),
+        "06_count_calls.CountCalls": counting.CountCalls,
+    }
+
+
+def cases():
+    """Yield (case name, decorator, shapes it supports)."""
+    all_shapes = tuple(SHAPES)
+    yield "baseline", lambda f: f, all_shapes + ("one",)
+    yield "timer", timer, all_shapes
+    yield "log_function_call", log_function_call, all_shapes
+    yield "memoize", memoize, ("zero", "positional")
+    yield "require_auth", require_auth, all_shapes
+    yield "retry", retry(max_attempts=3, delay=0), all_shapes
+    yield "validate_range", validate_range(0, 100), ("one",)
+    yield "CountCalls", CountCalls, all_shapes
+    for name, decorator in _replacements().items():
+        yield name, decorator, all_shapes
+
+    def stack(*decorators):
+        def apply(f):
+            for d in reversed(decorators):
+                f = d(f)
+            return f
+        return apply
+
+    yield "stack: require_auth+retry", stack(require_auth, retry(3, 0)), all_shapes
+    yield ("stack: timer+log_function_call+require_auth",
+           stack(timer, log_function_call, require_auth), all_shapes)
+    yield ("stack: timer+log+memoize+auth+retry+count",
+           stack(timer, log_function_call, memoize, require_auth, retry(3, 0), CountCalls),
+           ("zero", "positional"))
+
+
+def run(repeat, min_time):
+    results = []
+    baselines = {}
+    shapes = dict(SHAPES, one=(one, (50,), {}))
+    for case, decorator, supported in cases():
+        for shape in supported:
+            func, args, kwargs = shapes[shape]
+            decorated = decorator(func)
+            result = bench.measure(decorated, *args, kwargs=kwargs, name=f"{case}/{shape}",
+                                   repeat=repeat, min_time=min_time)
+            results.append(result)
+            if case == "baseline":
+                baselines[shape] = result.mean
+            base = baselines[shape]
+            print(f"  {result.name:58} {bench.format_time(result.mean):>10}"
+                  f"  overhead {bench.format_time(max(result.mean - base, 0.0)):>10}",
+                  file=sys.__stdout__)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Measure the per-call overhead of the decorator patterns.")
+    parser.add_argument("-o", "--output", help="write results to this JSON file")
+    parser.add_argument("--compare", metavar="OLD_JSON",
+                        help="compare against an earlier run and fail on regressions")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="slowdown ratio counted as a regression (default 0.10)")
+    parser.add_argument("--quick", action="store_true", help="fewer, shorter samples")
+    options = parser.parse_args(argv)
+
+    repeat, min_time = (5, 0.005) if options.quick else (15, 0.02)
+
+    # Send the tutorial decorators' print() and logging output to devnull.
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        logging.basicConfig(level=logging.INFO, stream=devnull, force=True)
+        try:
+            results = run(repeat, min_time)
+        finally:
+            for handler in logging.root.handlers[:]:   # they write to devnull
+                logging.root.removeHandler(handler)
+                handler.close()
+
+    if options.output:
+        bench.save_results(results, options.output, threshold=options.threshold)
+        print(f"saved {len(results)} results to {options.output}")
+
+    if options.compare:
+        _, old = bench.load_results(options.compare)
+        new = {r.name: r for r in results}
+        regressions = [name for name, c, regressed
+                       in bench.diff_results(old, new, options.threshold) if regressed]
+        for name in regressions:
+            print(f"REGRESSION: {name} x{new[name].mean / old[name].mean:.2f}")
+        if regressions:
+            return 1
+        print(f"no regressions beyond {options.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+#* Batch validation for validate_range
+# validate_range(min_val, max_val) in 01_Basic/07_decorators.py checks one
+# value per call. Validating a million ingested values that way is a million
+# Python calls, and the first bad value stops everything, so you learn about
+# bad rows one at a time.
+#
+# validate_range(..., batch=True) decorates a function that takes a whole
+# batch (list, array.array or NumPy array), checks every element in one pass
+# and reports *all* offending indices in a single RangeError:
+#   - NumPy arrays (and lists/array.arrays when NumPy is installed) are
+#     checked with one vectorized comparison
+#   - without NumPy, min(), max() and sum() run as C loops over the batch;
+#     only when they show a problem do we walk the elements in Python
+# The scalar form is unchanged.
+
+from array import array
+from functools import wraps
+
+try:
+    import numpy as np
+except ImportError:         # NumPy is optional
+    np = None
+
+
+class RangeError(ValueError):
+    """Raised with every out-of-range index of a batch at once."""
+
+    def __init__(self, min_val, max_val, indices, values):
+        self.min_val = min_val
+        self.max_val = max_val
+        self.indices = indices
+        self.values = values
+        shown = ", ".join(f"[{i}]={v!r}" for i, v in zip(indices[:5], values[:5]))
+        more = f" and {len(indices) - 5} more" if len(indices) > 5 else ""
+        super().__init__(f"{len(indices)} value(s) outside {min_val}..{max_val}: {shown}{more}")
+
+
+def _as_ndarray(values):
+    if isinstance(values, np.ndarray):
+        return values
+    if isinstance(values, array):
+        return np.frombuffer(values, dtype=values.typecode)     # zero-copy
+    return np.asarray(values)
+
+
+def _scan(values, min_val, max_val):
+    # `not lo <= v <= hi` (rather than `v < lo or v > hi`) also rejects NaN,
+    # exactly like the scalar decorator.
+    return [i for i, v in enumerate(values) if not min_val <= v <= max_val]
+
+
+def find_out_of_range(values, min_val, max_val):
+    """Return the indices of every value outside [min_val, max_val]."""
+    if np is not None and not isinstance(values, (str, bytes)):
+        arr = _as_ndarray(values)
+        if arr.dtype.kind in "iufb":
+            bad = ~((arr >= min_val) & (arr <= max_val))
+            return np.flatnonzero(bad).tolist()
+    if len(values) == 0:
+        return []
+    # Fast path for clean batches: min, max and sum are C-level loops. NaN
+    # compares false with everything, so min/max may skip it; sum does not.
+    if min(values) >= min_val and max(values) <= max_val:
+        total = sum(values)
+        if total == total:
+            return []
+    return _scan(values, min_val, max_val)
+
+
+def validate_range(min_val, max_val, *, batch=False):
+    """
+    Check that values lie in [min_val, max_val] before calling the function.
+
+    Args:
+        batch (bool): The function takes one sequence of values; all of them
+            are checked in one pass and a RangeError lists every bad index
+    """
+    def decorator(func):
+        if not batch:
+            @wraps(func)
+            def wrapper(value):
+                if not min_val <= value <= max_val:
+                    raise ValueError(f"Value must be between {min_val} and {max_val}")
+                return func(value)
+            return wrapper
+
+        @wraps(func)
+        def batch_wrapper(values):
+            bad = find_out_of_range(values, min_val, max_val)
+            if bad:
+                raise RangeError(min_val, max_val, bad, [values[i] for i in bad[:5]])
+            return func(values)
+        return batch_wrapper
+    return decorator
+
+
+if __name__ == "__main__":
+    import importlib
+    import random
+
+    bench = importlib.import_module("08_benchmark")
+
+    print("=" * 60)
+    print("1. SCALAR PATH IS UNCHANGED")
+    print("=" * 60)
+
+    @validate_range(0, 100)
+    def set_percentage(value):
+        return f"Percentage set to {value}%"
+
+    print(set_percentage(50))
+    try:
+        set_percentage(150)
+    except ValueError as e:
+        print(f"set_percentage(150) -> ValueError: {e}")
+
+    print("\n" + "=" * 60)
+    print("2. EVERY BAD INDEX AT ONCE")
+    print("=" * 60)
+
+    @validate_range(0, 100, batch=True)
+    def load_percentages(values):
+        return f"Loaded {len(values)} percentages"
+
+    print(load_percentages([10, 20, 30]))
+    for batch in ([10, -5, 30, 150, float("nan")], array("d", [1.0, 101.5, 2.0])):
+        try:
+            load_percentages(batch)
+        except RangeError as e:
+            print(f"RangeError: {e}")
+            print(f"  e.indices = {e.indices}")
+
+    print("\n" + "=" * 60)
+    print("3. ONE MILLION VALUES")
+    print("=" * 60)
+
+    print(f"NumPy available: {np is not None}")
+    random.seed(0)
+    values = [random.uniform(0, 100) for _ in range(1_000_000)]
+    batches = [("list", values), ("array.array", array("d", values))]
+    if np is not None:
+        batches.append(("numpy", np.array(values)))
+
+    def one_call_per_value(values):
+        for v in values:
+            set_percentage(v)
+
+    per_value = bench.measure(one_call_per_value, values, name="per-value calls",
+                              repeat=5, number=1, warmup=1)
+    print(f"{per_value.name:22} {bench.format_time(per_value.mean):>10}")
+    for label, data in batches:
+        r = bench.measure(load_percentages, data, name=f"batch ({label})",
+                          repeat=5, number=1, warmup=1)
+        print(f"{r.name:22} {bench.format_time(r.mean):>10}  "
+              f"x{per_value.mean / r.mean:.0f} faster")
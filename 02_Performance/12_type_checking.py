@@ -0,0 +1,324 @@
+#* Runtime type checking compiled once per function
+# The type hints in 01_Basic/06_function.py are documentation only:
+#
+#     def add_typed(a: int, b: int) -> int: ...
+#     add_typed("5", "3")       # returns "53", nobody complains
+#
+# Generic runtime checkers fix that by walking the typing objects on every
+# call, which is slow. @typechecked does the walking once, at decoration time:
+#   - plain classes (int, str, Optional[int], int | None, ...) become a single
+#     isinstance() with a precomputed tuple of classes
+#   - containers (list[int], dict[str, float], tuple[int, ...], ...) become a
+#     validator function built once and cached per annotation
+#   - the wrapper is generated with exec() using the function's own parameter
+#     list (see 10_decorator_fusion.py), so nothing is re-parsed per call
+#   - sample=N checks only one call in N, for hot paths
+#   - an `async def` gets an async wrapper, and its return annotation is
+#     checked against the awaited result (19_async_decorators.py)
+#
+# Numbers follow PEP 484: an int is accepted where float is expected, and an
+# int or float where complex is. A parameter whose default is None also
+# accepts None. Annotations we cannot check cheaply (Callable signatures,
+# Iterator element types, ...) fall back to an isinstance() of their origin.
+
+import collections.abc
+import importlib
+import inspect
+import itertools
+import linecache
+import types
+import typing
+from functools import lru_cache, update_wrapper
+
+async_support = importlib.import_module("19_async_decorators")
+fusion = importlib.import_module("10_decorator_fusion")
+
+_PREFIX = "_tc_"
+_NUMERIC_TOWER = {float: (float, int), complex: (complex, float, int)}
+_SEQUENCES = {list, set, frozenset, collections.abc.Sequence, collections.abc.MutableSequence,
+              collections.abc.Set, collections.abc.MutableSet, collections.abc.Collection}
+_MAPPINGS = {dict, collections.abc.Mapping, collections.abc.MutableMapping}
+_ids = itertools.count()
+
+
+def _type_name(tp):
+    if isinstance(tp, type) and not typing.get_args(tp):
+        return tp.__name__
+    return repr(tp).replace("typing.", "")
+
+
+def _predicate(check):
+    """Turn a compiled check (tuple of classes or function) into a function."""
+    if callable(check):
+        return check
+    return lambda value: isinstance(value, check)
+
+
+@lru_cache(maxsize=None)
+def compile_check(tp):
+    """
+    Compile an annotation into a cheap check.
+
+    Returns None (anything goes), a tuple of classes for isinstance(), or a
+    predicate function for containers and other structured types.
+    """
+    if tp is typing.Any or tp is object:
+        return None
+    if tp is None or tp is type(None):
+        return (type(None),)
+    if tp in _NUMERIC_TOWER:
+        return _NUMERIC_TOWER[tp]
+    if isinstance(tp, typing.TypeVar):
+        return compile_check(tp.__bound__) if tp.__bound__ is not None else None
+
+    origin, args = typing.get_origin(tp), typing.get_args(tp)
+    if origin is None:
+        return (tp,) if isinstance(tp, type) else None
+
+    if origin is typing.Union or origin is types.UnionType:
+        parts = [compile_check(arg) for arg in args]
+        if any(part is None for part in parts):
+            return None
+        if all(isinstance(part, tuple) for part in parts):
+            return tuple(dict.fromkeys(cls for part in parts for cls in part))
+        preds = [_predicate(part) for part in parts]
+        return lambda value: any(pred(value) for pred in preds)
+
+    if origin is typing.Literal:
+        allowed = [(type(arg), arg) for arg in args]
+        return lambda value: (type(value), value) in allowed
+
+    if origin is tuple:
+        if len(args) == 2 and args[1] is Ellipsis:
+            item = compile_check(args[0])
+            if item is None:
+                return (tuple,)
+            item = _predicate(item)
+            return lambda value: isinstance(value, tuple) and all(map(item, value))
+        items = [_predicate(compile_check(arg) or (object,)) for arg in args]
+        return lambda value: (isinstance(value, tuple) and len(value) == len(items)
+                              and all(pred(v) for pred, v in zip(items, value)))
+
+    if origin in _SEQUENCES:
+        item = compile_check(args[0]) if args else None
+        if item is None:
+            return (origin,)
+        if isinstance(item, tuple):
+            return lambda value: (isinstance(value, origin)
+                                  and all(isinstance(v, item) for v in value))
+        return lambda value: isinstance(value, origin) and all(map(item, value))
+
+    if origin in _MAPPINGS:
+        key = _predicate(compile_check(args[0]) or (object,)) if args else None
+        val = _predicate(compile_check(args[1]) or (object,)) if args else None
+        if key is None:
+            return (origin,)
+        return lambda value: (isinstance(value, origin)
+                              and all(key(k) and val(v) for k, v in value.items()))
+
+    if origin is type:
+        bound = compile_check(args[0]) if args else None
+        if not isinstance(bound, tuple):
+            return (type,)
+        return lambda value: isinstance(value, type) and issubclass(value, bound)
+
+    # Callable[...], Iterator[...], Awaitable[...] and friends: check the
+    # container type only, the contents cannot be checked without using them.
+    return (origin,) if isinstance(origin, type) else None
+
+
+def _fail(func_name, what, value, expected):
+    raise TypeError(f"{func_name}() {what} must be {_type_name(expected)}, "
+                    f"not {type(value).__name__}")
+
+
+def typechecked(func=None, *, sample=1):
+    """
+    Enforce a function's annotations at call time.
+
+    Args:
+        sample (int): Check only one call in every `sample` calls
+    """
+    def decorator(f):
+        sig = inspect.signature(f)
+        hints = typing.get_type_hints(f)
+        # Builtins go in under the prefix too: a parameter called `next`
+        # would otherwise shadow them inside the generated wrapper.
+        namespace = {f"{_PREFIX}func": f, f"{_PREFIX}fail": _fail,
+                     f"{_PREFIX}counter": itertools.count(),
+                     f"{_PREFIX}name": f.__qualname__,
+                     f"{_PREFIX}next": next, f"{_PREFIX}isinstance": isinstance}
+        is_async = async_support.function_kind(f) == async_support.COROUTINE
+        call = f"{'await ' if is_async else ''}{_PREFIX}func"
+        params, call_args = fusion.signature_source(sig, namespace)
+        checks = []
+
+        def add_check(target, name, what, annotation, default=inspect.Parameter.empty):
+            check = compile_check(annotation)
+            if check is None:
+                return
+            if default is None and isinstance(check, tuple) and type(None) not in check:
+                check += (type(None),)
+            elif default is None and not isinstance(check, tuple):
+                inner = check
+                check = lambda value: value is None or inner(value)
+            namespace[f"{_PREFIX}c_{name}"] = check
+            namespace[f"{_PREFIX}t_{name}"] = annotation
+            test = (f"{_PREFIX}isinstance({target}, {_PREFIX}c_{name})" if isinstance(check, tuple)
+                    else f"{_PREFIX}c_{name}({target})")
+            checks.append((target, name, what, test))
+
+        for p in sig.parameters.values():
+            if p.name.startswith(_PREFIX):
+                raise ValueError(f"Parameter name {p.name!r} clashes with typechecked internals")
+            if p.name not in hints:
+                continue
+            if p.kind is p.VAR_POSITIONAL:
+                add_check(f"{_PREFIX}item", p.name, f"*{p.name} items", hints[p.name])
+            elif p.kind is p.VAR_KEYWORD:
+                add_check(f"{_PREFIX}item", p.name, f"**{p.name} values", hints[p.name])
+            else:
+                add_check(p.name, p.name, f"argument {p.name!r}", hints[p.name], p.default)
+
+        lines = [f"{'async ' if is_async else ''}def {_PREFIX}wrapper({params}):"]
+        if sample > 1:
+            lines.append(f"    if {_PREFIX}next({_PREFIX}counter) % {sample}:")
+            lines.append(f"        return {call}({call_args})")
+        for target, name, what, test in checks:
+            indent = "    "
+            if target == f"{_PREFIX}item":
+                kind = sig.parameters[name].kind
+                source = name if kind is inspect.Parameter.VAR_POSITIONAL else f"{name}.values()"
+                lines.append(f"    for {_PREFIX}item in {source}:")
+                indent = "        "
+            lines.append(f"{indent}if not {test}:")
+            lines.append(f"{indent}    {_PREFIX}fail({_PREFIX}name, {what!r}, {target}, "
+                         f"{_PREFIX}t_{name})")
+
+        if "return" in hints and compile_check(hints["return"]) is not None:
+            checks.clear()
+            add_check(f"{_PREFIX}result", "return", "return value", hints["return"])
+            _, _, what, test = checks[0]
+            lines.append(f"    {_PREFIX}result = {call}({call_args})")
+            lines.append(f"    if not {test}:")
+            lines.append(f"        {_PREFIX}fail({_PREFIX}name, {what!r}, {_PREFIX}result, "
+                         f"{_PREFIX}t_return)")
+            lines.append(f"    return {_PREFIX}result")
+        else:
+            lines.append(f"    return {call}({call_args})")
+
+        source = "\n".join(lines)
+        filename = f"<typechecked {f.__qualname__} #{next(_ids)}>"
+        linecache.cache[filename] = (len(source), None, source.splitlines(True), filename)
+        exec(compile(source, filename, "exec"), namespace)
+        wrapper = update_wrapper(namespace[f"{_PREFIX}wrapper"], f)
+        wrapper.__typecheck_source__ = source
+        return wrapper
+
+    if func is None:
+        return decorator
+    return decorator(func)
+
+
+if __name__ == "__main__":
+    import asyncio
+    from typing import Optional
+
+    bench = importlib.import_module("08_benchmark")
+
+    print("=" * 60)
+    print("1. THE 06_function.py EXAMPLES, ENFORCED")
+    print("=" * 60)
+
+    @typechecked
+    def add_typed(a: int, b: int) -> int:
+        return a + b
+
+    @typechecked
+    def greet_typed(name: str, times: int = 1) -> str:
+        return (name + "! ") * times
+
+    print(f"add_typed(5, 3) = {add_typed(5, 3)}")
+    print(f"greet_typed('Hello', 3) = {greet_typed('Hello', 3)}")
+    for call in (lambda: add_typed("5", "3"), lambda: greet_typed("Hi", times=2.5)):
+        try:
+            call()
+        except TypeError as e:
+            print(f"TypeError: {e}")
+
+    print("\n" + "=" * 60)
+    print("2. CONTAINERS, UNIONS AND *ARGS")
+    print("=" * 60)
+
+    @typechecked
+    def average(scores: dict[str, list[float]], *extra: int,
+                label: Optional[str] = None) -> dict[str, float]:
+        return {name: sum(values) / len(values) for name, values in scores.items()}
+
+    print(f"average(...) = {average({'alice': [90, 85.5]}, 1, 2, label='midterm')}")
+    for bad in (lambda: average({"bob": [90, "A"]}), lambda: average({}, 1, "2")):
+        try:
+            bad()
+        except TypeError as e:
+            print(f"TypeError: {e}")
+
+    print("\nGenerated wrapper:")
+    print(average.__typecheck_source__)
+
+    print("\n" + "=" * 60)
+    print("3. ASYNC FUNCTIONS AND AWKWARD PARAMETER NAMES")
+    print("=" * 60)
+
+    @typechecked
+    async def fetch_count(page: int) -> int:
+        await asyncio.sleep(0)
+        return page * 10
+
+    @typechecked
+    async def fetch_label(page: int) -> str:
+        return page
+
+    assert inspect.iscoroutinefunction(fetch_count)
+    assert asyncio.run(fetch_count(3)) == 30
+    print(f"await fetch_count(3) = {asyncio.run(fetch_count(3))}")
+    for coro in (lambda: fetch_count("3"), lambda: fetch_label(3)):
+        try:
+            asyncio.run(coro())
+            raise AssertionError("expected a TypeError")
+        except TypeError as e:
+            print(f"TypeError: {e}")
+
+    @typechecked(sample=2)
+    def link(prev: int, next: int, isinstance: int = 0) -> int:
+        return prev + next + isinstance
+
+    assert [link(1, 2) for _ in range(4)] == [3] * 4
+    print(f"link(prev=1, next=2) with sample=2 = {link(1, 2)}")
+
+    print("\n" + "=" * 60)
+    print("4. COST PER CALL")
+    print("=" * 60)
+
+    def naive_typechecked(func):
+        # Re-reads the hints and binds the arguments on every call.
+        def wrapper(*args, **kwargs):
+            hints = typing.get_type_hints(func)
+            bound = inspect.signature(func).bind(*args, **kwargs)
+            for name, value in bound.arguments.items():
+                if name in hints and not isinstance(value, hints[name]):
+                    raise TypeError(f"{name} must be {hints[name].__name__}")
+            return func(*args, **kwargs)
+        return wrapper
+
+    def add(a: int, b: int) -> int:
+        return a + b
+
+    candidates = [
+        ("undecorated", add),
+        ("per-call reflection", naive_typechecked(add)),
+        ("compiled", typechecked(add)),
+        ("compiled, sample=100", typechecked(add, sample=100)),
+    ]
+    for label, fn in candidates:
+        r = bench.measure(fn, 5, 3, name=label, repeat=15)
+        print(f"{label:22} {bench.format_time(r.mean):>10} per call")
@@ -0,0 +1,300 @@
+#* @record: slotted classes with generated methods
+# add_repr in 01_Basic/07_decorators.py patches in a __repr__ that formats
+# self.__dict__ on every call, and classes like Person, Car and Circle each
+# carry a per-instance __dict__: a hash table of their attributes, which for a
+# two-field object is larger than the object itself.
+#
+# @record reads the field names from the class annotations and generates,
+# with exec(), code specialised for exactly those fields:
+#   __slots__   attributes live in fixed slots, no per-instance __dict__
+#   __init__    assigns each field directly, defaults baked in
+#   __repr__    Person(name='Alice', age=30)
+#   __eq__      compares field tuples of same-class instances
+#   __hash__    hashes the field tuple (pass hash=False for objects you mutate
+#               while they sit in a set or dict)
+#   __lt__ ... only with order=True, compares field tuples
+#
+# Slots can only be created with the class, so the decorator builds a new
+# class from the old one's namespace. Slotted instances do not support
+# weakrefs unless you list "__weakref__" in your own __slots__; extra slots of
+# your own (`__slots__ = ("_cache",)`) are kept. Instances only lose their
+# __dict__ when every base class is slotted too: a record derived from a
+# plain class (like Circle(Shape) in the demo) still has one.
+
+import dataclasses
+import linecache
+import re
+import typing
+from itertools import count
+
+_PREFIX = "_rec_"
+_ids = count()
+
+
+def _is_pseudo_field(annotation):
+    """ClassVar[...] and InitVar[...] annotations are not fields (as in dataclasses)."""
+    if isinstance(annotation, str):     # from __future__ import annotations
+        return re.match(r"(?:\w+\.)*(?:ClassVar|InitVar)\b", annotation) is not None
+    return (annotation is typing.ClassVar or typing.get_origin(annotation) is typing.ClassVar
+            or annotation is dataclasses.InitVar
+            or isinstance(annotation, dataclasses.InitVar))
+
+
+def _fields(cls):
+    fields = []
+    for base in reversed(cls.__mro__[1:]):
+        fields.extend(f for f in getattr(base, "__record_fields__", ()) if f not in fields)
+    own = [name for name, annotation in cls.__dict__.get("__annotations__", {}).items()
+           if name not in fields and not _is_pseudo_field(annotation)]
+    return fields, own
+
+
+def _methods_source(fields, defaults, eq, hash, order):
+    args = ", ".join(f"{f}={_PREFIX}default_{f}" if f in defaults else f for f in fields)
+    values = ", ".join(f"self.{f}" for f in fields) + ("," if len(fields) == 1 else "")
+    others = ", ".join(f"other.{f}" for f in fields) + ("," if len(fields) == 1 else "")
+    lines = [f"def __init__(self, {args}):" if fields else "def __init__(self):"]
+    lines += [f"    self.{f} = {f}" for f in fields] or ["    pass"]
+    shown = ", ".join(f"{f}={{self.{f}!r}}" for f in fields)
+    lines += ["def __repr__(self):", f'    return f"{{self.__class__.__name__}}({shown})"']
+    if eq:
+        lines += ["def __eq__(self, other):",
+                  "    if other.__class__ is self.__class__:",
+                  f"        return ({values}) == ({others})",
+                  "    return NotImplemented"]
+    if eq and hash:
+        lines += ["def __hash__(self):", f"    return hash(({values}))"]
+    if order:
+        for method, op in (("__lt__", "<"), ("__le__", "<="), ("__gt__", ">"), ("__ge__", ">=")):
+            lines += [f"def {method}(self, other):",
+                      "    if other.__class__ is self.__class__:",
+                      f"        return ({values}) {op} ({others})",
+                      "    return NotImplemented"]
+    return "\n".join(lines)
+
+
+def _defaults(cls, inherited, own):
+    # Base records keep their defaults in __record_defaults__ (the class
+    # attributes became slots); this class's defaults are plain attributes.
+    defaults = {}
+    for klass in reversed(cls.__mro__[1:]):
+        defaults.update(klass.__dict__.get("__record_defaults__", {}))
+    defaults.update((f, cls.__dict__[f]) for f in own if f in cls.__dict__)
+
+    seen_default = None
+    for f in inherited + own:
+        if f not in defaults:
+            if seen_default is not None:
+                raise TypeError(f"Field {f!r} without a default follows {seen_default!r}")
+            continue
+        seen_default = f
+        if isinstance(defaults[f], (list, dict, set)):
+            raise ValueError(f"Mutable default {defaults[f]!r} for field {f!r} would be "
+                             f"shared by every instance")
+    return defaults
+
+
+def rebuild_class(cls, body):
+    """
+    Create a replacement for cls from a new class namespace.
+
+    Needed whenever __slots__ change, since slots are fixed at class creation.
+    """
+    new_cls = type(cls)(cls.__name__, cls.__bases__, body)
+    new_cls.__qualname__ = cls.__qualname__
+
+    # Methods using zero-argument super() or __class__ closed over the old
+    # class; point them at the new one.
+    for value in body.values():
+        for func in _functions(value):
+            code = func.__code__
+            if "__class__" in code.co_freevars:
+                cell = func.__closure__[code.co_freevars.index("__class__")]
+                if cell.cell_contents is cls:
+                    cell.cell_contents = new_cls
+    return new_cls
+
+
+def _functions(value, seen=None):
+    """Yield the functions inside a class attribute: the function itself, the
+    fget/fset/fdel of a property, what classmethod, staticmethod,
+    cached_property and functools.wraps wrappers hold."""
+    seen = set() if seen is None else seen
+    if value is None or id(value) in seen:
+        return
+    seen.add(id(value))
+    if hasattr(value, "__code__"):
+        yield value
+    for attr in ("__func__", "fget", "fset", "fdel", "func", "__wrapped__"):
+        inner = getattr(value, attr, None)
+        if inner is not None and not isinstance(inner, type):
+            yield from _functions(inner, seen)
+
+
+def record(cls=None, *, eq=True, hash=True, order=False):
+    """
+    Turn an annotated class into a slotted record with generated methods.
+
+    Args:
+        eq (bool): Generate __eq__ comparing all fields
+        hash (bool): Generate __hash__ from all fields (requires eq)
+        order (bool): Generate __lt__, __le__, __gt__ and __ge__
+    """
+    def decorate(cls):
+        inherited, own = _fields(cls)
+        fields = inherited + own
+        defaults = _defaults(cls, inherited, own)
+        namespace = {f"{_PREFIX}default_{f}": value for f, value in defaults.items()}
+
+        source = _methods_source(fields, defaults, eq, hash, order)
+        filename = f"<record {cls.__qualname__} #{next(_ids)}>"
+        linecache.cache[filename] = (len(source), None, source.splitlines(True), filename)
+        exec(compile(source, filename, "exec"), namespace)
+
+        slots = cls.__dict__.get("__slots__", ())
+        slots = (slots,) if isinstance(slots, str) else tuple(slots)
+        # The old class's own slots exist as member descriptors in its
+        # namespace; the new class creates its own for them.
+        body = {k: v for k, v in cls.__dict__.items()
+                if k not in own and k not in slots and k not in ("__dict__", "__weakref__")}
+        body["__slots__"] = tuple(own) + slots
+        body["__record_fields__"] = tuple(fields)
+        body["__record_defaults__"] = defaults
+        body["__match_args__"] = tuple(fields)
+        for method in ("__init__", "__repr__", "__eq__", "__hash__",
+                       "__lt__", "__le__", "__gt__", "__ge__"):
+            if method in namespace and method not in cls.__dict__:
+                body[method] = namespace[method]
+                body[method].__qualname__ = f"{cls.__qualname__}.{method}"
+
+        return rebuild_class(cls, body)
+
+    if cls is None:
+        return decorate
+    return decorate(cls)
+
+
+if __name__ == "__main__":
+    import importlib
+    import sys
+    import tracemalloc
+
+    bench = importlib.import_module("08_benchmark")
+
+    print("=" * 60)
+    print("1. GENERATED METHODS")
+    print("=" * 60)
+
+    @record
+    class Person:
+        name: str
+        age: int = 0
+
+        def birthday(self):
+            self.age += 1
+            return self
+
+    alice = Person("Alice", 30)
+    print(f"alice = {alice!r}")
+    print(f"alice == Person('Alice', 30): {alice == Person('Alice', 30)}")
+    print(f"len({{alice, Person('Alice', 30)}}) = {len({alice, Person('Alice', 30)})}")
+    print(f"hasattr(alice, '__dict__') = {hasattr(alice, '__dict__')}")
+    try:
+        alice.nickname = "Al"
+    except AttributeError as e:
+        print(f"alice.nickname = 'Al' -> AttributeError: {e}")
+
+    @record(order=True)
+    class Car:
+        name: str
+        year: int
+
+    print(f"sorted cars: {sorted([Car('Toyota', 2020), Car('Honda', 2018)])}")
+
+    class Shape:
+        def describe(self):
+            return "a shape"
+
+    @record
+    class Circle(Shape):
+        radius: float
+
+        @property
+        def area(self):
+            return 3.14159 * self.radius ** 2
+
+        def describe(self):
+            return f"{super().describe()} with area {self.area}"   # super() still works
+
+    print(f"Circle(5).describe() = {Circle(5).describe()!r}")
+    print(f"hasattr(Circle(5), '__dict__') = {hasattr(Circle(5), '__dict__')} "
+          f"(Shape is not slotted)")
+
+    @record
+    class Point:
+        __slots__ = ("_norm",)
+        x: float
+        y: float
+
+        def norm(self):
+            try:
+                return self._norm
+            except AttributeError:
+                self._norm = (self.x ** 2 + self.y ** 2) ** 0.5
+                return self._norm
+
+    class Point3(Point):
+        __slots__ = ()
+
+    assert Point(3, 4).norm() == 5.0 and repr(Point3(1, 2)) == "Point3(x=1, y=2)"
+    print(f"own __slots__ kept: Point(3, 4).norm() = {Point(3, 4).norm()}, "
+          f"subclass repr: {Point3(1, 2)!r}")
+
+    print("\n" + "=" * 60)
+    print("2. MEMORY FOR 100,000 RECORDS")
+    print("=" * 60)
+
+    def add_repr(cls):
+        def __repr__(self):
+            return f"{self.__class__.__name__}({self.__dict__})"
+        cls.__repr__ = __repr__
+        return cls
+
+    @add_repr
+    class DictPerson:
+        def __init__(self, name, age):
+            self.name = name
+            self.age = age
+
+    names = [f"person{i}" for i in range(100_000)]
+
+    def allocated(factory):
+        tracemalloc.start()
+        people = [factory(name, i) for i, name in enumerate(names)]
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del people
+        return size
+
+    dict_size = allocated(DictPerson)
+    slot_size = allocated(Person)
+    print(f"dict-backed: {dict_size / 1e6:6.1f} MB ({sys.getsizeof(DictPerson('a', 1))} B object "
+          f"+ __dict__)")
+    print(f"@record:     {slot_size / 1e6:6.1f} MB ({sys.getsizeof(Person('a', 1))} B object)")
+    print(f"saved {1 - slot_size / dict_size:.0%}")
+
+    print("\n" + "=" * 60)
+    print("3. SPEED")
+    print("=" * 60)
+
+    old, new = DictPerson("Alice", 30), Person("Alice", 30)
+    for label, fn in [
+        ("construct dict-backed", lambda: DictPerson("Alice", 30)),
+        ("construct @record", lambda: Person("Alice", 30)),
+        ("read attr dict-backed", lambda: old.age),
+        ("read attr @record", lambda: new.age),
+        ("repr dict-backed", lambda: repr(old)),
+        ("repr @record", lambda: repr(new)),
+    ]:
+        r = bench.measure(fn, name=label, repeat=15)
+        print(f"{label:22} {bench.format_time(r.mean):>10}")
@@ -0,0 +1,452 @@
+#* Columnar storage for dataclasses
+# The @dataclass Point(x, y) example in 01_Basic/07_decorators.py is fine for
+# one point. A list of a million of them is a million objects, each with its
+# own __dict__ and two boxed floats (well over 100 bytes per point), and
+# every bulk operation is a Python loop that creates a million new objects.
+#
+# ColumnStore(Point) keeps each field in one contiguous typed array instead
+# (struct of arrays: 8 bytes per float field per point):
+#   store[i]           a lightweight view; reads and writes go to the arrays
+#   store["x"]         a Column; + - * / and comparisons work on whole
+#                      columns at once and comparisons give masks
+#   store[mask]        a new store with the rows where the mask is true
+#   store.sort("x")    reorder every column by one or more keys
+#   store.export("x")  the column's memory as a memoryview, without copying
+#
+# The arrays are array.array ("d" for float fields, "q" for int fields).
+# When NumPy is installed, column operations run through zero-copy NumPy
+# views of those arrays. Without it they run as map()/compress() over the
+# arrays: arithmetic still beats rebuilding a list of objects, but filtering
+# and sorting have to box every float on the way and are slower than on a
+# list of Points. The memory saving holds either way.
+#
+# A store cannot grow while a memoryview of one of its columns is alive:
+# array.array raises BufferError rather than moving memory under the view.
+
+import operator
+import typing
+from array import array
+from dataclasses import fields, is_dataclass
+from itertools import compress, repeat
+
+try:
+    import numpy as np
+except ImportError:         # NumPy is optional
+    np = None
+
+TYPECODES = {float: "d", int: "q"}
+_MASK = "b"
+
+
+def _typecode_of(data):
+    if isinstance(data, array):
+        return data.typecode
+    return {"f": "d", "i": "q", "u": "q", "b": _MASK}[data.dtype.kind]
+
+
+def _as_array(data, typecode=None):
+    typecode = typecode or _typecode_of(data)
+    if isinstance(data, array):
+        return data if data.typecode == typecode else array(typecode, data)
+    if np is not None and isinstance(data, np.ndarray):
+        return array(typecode, data.astype(typecode if typecode != _MASK else "b").tobytes())
+    return array(typecode, data)
+
+
+def _as_numpy(data):
+    if isinstance(data, array):
+        return np.frombuffer(data, dtype=data.typecode)    # zero-copy
+    return data
+
+
+def _has_negative(values):
+    if isinstance(values, (int, float)):
+        return values < 0
+    if np is not None and isinstance(values, np.ndarray):
+        return values.size > 0 and bool(values.min() < 0)
+    return min(values, default=0) < 0
+
+
+def _result_typecode(op, left, right):
+    if op in (operator.lt, operator.le, operator.gt, operator.ge, operator.eq, operator.ne,
+              operator.and_, operator.or_):
+        return _MASK
+    if op is operator.truediv or "d" in (left, right):
+        return "d"
+    return "q"
+
+
+class Column:
+    """A whole column: arithmetic and comparisons apply to every element."""
+
+    __slots__ = ("data",)
+
+    def __init__(self, data):
+        self.data = data
+
+    @property
+    def typecode(self):
+        return _typecode_of(self.data)
+
+    def __len__(self):
+        return len(self.data)
+
+    def __iter__(self):
+        return iter(self.data)
+
+    def __getitem__(self, index):
+        return self.data[index]
+
+    def __repr__(self):
+        shown = ", ".join(map(repr, list(self.data[:6])))
+        more = ", ..." if len(self.data) > 6 else ""
+        return f"Column('{self.typecode}', [{shown}{more}], len={len(self.data)})"
+
+    def _apply(self, op, other, reflected=False):
+        other_typecode = "d" if isinstance(other, float) else "q"
+        if isinstance(other, Column):
+            if len(other) != len(self):
+                raise ValueError(f"Column lengths differ: {len(self)} and {len(other)}")
+            other_typecode, other = other.typecode, other.data
+        typecode = _result_typecode(op, self.typecode, other_typecode)
+
+        # int ** negative int is a float, as with true division.
+        negative_power = op is operator.pow and typecode == "q" and _has_negative(other)
+
+        if np is not None:
+            left = _as_numpy(self.data)
+            right = _as_numpy(other) if isinstance(other, array) else other
+            if negative_power:
+                left = left.astype("d")
+            return Column(op(right, left) if reflected else op(left, right))
+
+        others = other if isinstance(other, (array, list)) else repeat(other)
+        values = map(op, others, self.data) if reflected else map(op, self.data, others)
+        return Column(array("d" if negative_power else typecode, values))
+
+    def __add__(self, other): return self._apply(operator.add, other)
+    def __radd__(self, other): return self._apply(operator.add, other, reflected=True)
+    def __sub__(self, other): return self._apply(operator.sub, other)
+    def __rsub__(self, other): return self._apply(operator.sub, other, reflected=True)
+    def __mul__(self, other): return self._apply(operator.mul, other)
+    def __rmul__(self, other): return self._apply(operator.mul, other, reflected=True)
+    def __truediv__(self, other): return self._apply(operator.truediv, other)
+    def __rtruediv__(self, other): return self._apply(operator.truediv, other, reflected=True)
+    def __pow__(self, other): return self._apply(operator.pow, other)
+    def __lt__(self, other): return self._apply(operator.lt, other)
+    def __le__(self, other): return self._apply(operator.le, other)
+    def __gt__(self, other): return self._apply(operator.gt, other)
+    def __ge__(self, other): return self._apply(operator.ge, other)
+    def __eq__(self, other): return self._apply(operator.eq, other)
+    def __ne__(self, other): return self._apply(operator.ne, other)
+    def __and__(self, other): return self._apply(operator.and_, other)
+    def __or__(self, other): return self._apply(operator.or_, other)
+
+    __hash__ = None
+
+    def __invert__(self):
+        if np is not None:
+            return Column(~_as_numpy(self.data).astype(bool))
+        return Column(array(_MASK, map(operator.not_, self.data)))
+
+    def __neg__(self):
+        if np is not None:
+            return Column(-_as_numpy(self.data))
+        return Column(array(self.typecode, map(operator.neg, self.data)))
+
+    def sum(self):
+        return _as_numpy(self.data).sum().item() if np is not None else sum(self.data)
+
+    def min(self):
+        return _as_numpy(self.data).min().item() if np is not None else min(self.data)
+
+    def max(self):
+        return _as_numpy(self.data).max().item() if np is not None else max(self.data)
+
+    def mean(self):
+        return self.sum() / len(self.data)
+
+
+_view_classes = {}
+
+
+def _view_class(cls, names):
+    """Build (once per dataclass) a slotted view class with one property per field."""
+    view = _view_classes.get(cls)
+    if view is not None:
+        return view
+
+    def field_property(name):
+        def get(self):
+            return self._store._columns[name][self._index]
+
+        def set(self, value):
+            self._store._columns[name][self._index] = value
+        return property(get, set)
+
+    def __repr__(self):
+        values = ", ".join(f"{name}={getattr(self, name)!r}" for name in names)
+        return f"{cls.__name__}({values})"
+
+    def __eq__(self, other):
+        if isinstance(other, (cls, view)):
+            return all(getattr(self, n) == getattr(other, n) for n in names)
+        return NotImplemented
+
+    def to_object(self):
+        """Materialise the row as a real dataclass instance."""
+        return cls(*(self._store._columns[name][self._index] for name in names))
+
+    namespace = {name: field_property(name) for name in names}
+    namespace.update(__slots__=("_store", "_index"), __repr__=__repr__, __eq__=__eq__,
+                     __hash__=None, __match_args__=tuple(names), to_object=to_object)
+    view = type(f"{cls.__name__}View", (), namespace)
+    _view_classes[cls] = view
+    return view
+
+
+class ColumnStore:
+    """
+    Struct-of-arrays container for the instances of a dataclass.
+
+    Args:
+        cls: A dataclass whose fields are all annotated int or float
+        rows: Optional instances (or tuples in field order) to start with
+    """
+
+    def __init__(self, cls, rows=()):
+        if not is_dataclass(cls):
+            raise TypeError(f"{cls!r} is not a dataclass")
+        hints = typing.get_type_hints(cls)
+        self.cls = cls
+        self.names = tuple(f.name for f in fields(cls))
+        self._columns = {}
+        for name in self.names:
+            typecode = TYPECODES.get(hints.get(name))
+            if typecode is None:
+                raise TypeError(f"Field {name!r} of {cls.__name__} must be int or float "
+                                f"to be stored in a column")
+            self._columns[name] = array(typecode)
+        self._view = _view_class(cls, self.names)
+        self.extend(rows)
+
+    @classmethod
+    def from_columns(cls, dataclass, **columns):
+        """Build a store straight from one sequence (or Column) per field."""
+        store = cls(dataclass)
+        lengths = {len(columns[name]) for name in store.names}
+        if len(lengths) > 1:
+            raise ValueError(f"Columns have different lengths: {sorted(lengths)}")
+        for name in store.names:
+            values = columns[name]
+            values = values.data if isinstance(values, Column) else values
+            store._columns[name] = _as_array(values, store._columns[name].typecode)
+        return store
+
+    def _empty_like(self):
+        store = object.__new__(type(self))
+        store.cls, store.names, store._view = self.cls, self.names, self._view
+        store._columns = {}
+        return store
+
+    def __len__(self):
+        return len(self._columns[self.names[0]]) if self.names else 0
+
+    def __iter__(self):
+        view = self._view
+        for i in range(len(self)):
+            row = object.__new__(view)
+            row._store, row._index = self, i
+            yield row
+
+    def __repr__(self):
+        return f"ColumnStore({self.cls.__name__}, {len(self)} rows)"
+
+    def append(self, row):
+        """Add one instance (or tuple in field order)."""
+        self.extend((row,))
+
+    def extend(self, rows):
+        """
+        Add many instances (or tuples in field order).
+
+        All or nothing: if any value does not fit its column, every column is
+        cut back to its old length and the error is raised.
+        """
+        getters = [operator.attrgetter(name) for name in self.names]
+        columns = list(self._columns.values())
+        start = len(self)
+        try:
+            for row in rows:
+                values = row if isinstance(row, tuple) else [get(row) for get in getters]
+                for column, value in zip(columns, values, strict=True):
+                    column.append(value)
+        except BaseException:
+            for column in columns:
+                del column[start:]
+            raise
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return Column(self._columns[key])
+        if isinstance(key, int):
+            if not -len(self) <= key < len(self):
+                raise IndexError("ColumnStore index out of range")
+            row = object.__new__(self._view)
+            row._store, row._index = self, key % len(self)
+            return row
+        store = self._empty_like()
+        if isinstance(key, slice):
+            store._columns = {name: col[key] for name, col in self._columns.items()}
+        elif isinstance(key, Column) and key.typecode == _MASK:
+            store._columns = self._filter(key.data)
+        else:
+            store._columns = self._take(list(key))
+        return store
+
+    def __setitem__(self, name, values):
+        """Replace a whole column: store["x"] = store["x"] + 1 or store["x"] = 0."""
+        column = self._columns[name]
+        if isinstance(values, Column):
+            values = values.data
+        if isinstance(values, (int, float)):
+            values = array(column.typecode, [values]) * len(self)
+        elif len(values) != len(self):
+            raise ValueError(f"Column {name!r} needs {len(self)} values, got {len(values)}")
+        self._columns[name] = _as_array(values, column.typecode)
+
+    def _filter(self, mask):
+        if np is not None:
+            keep = _as_numpy(mask).astype(bool)
+            return {name: _as_array(_as_numpy(col)[keep], col.typecode)
+                    for name, col in self._columns.items()}
+        return {name: array(col.typecode, compress(col, mask))
+                for name, col in self._columns.items()}
+
+    def _take(self, indices):
+        if np is not None:
+            idx = np.asarray(indices, dtype=np.intp)
+            return {name: _as_array(_as_numpy(col)[idx], col.typecode)
+                    for name, col in self._columns.items()}
+        return {name: array(col.typecode, map(col.__getitem__, indices))
+                for name, col in self._columns.items()}
+
+    def argsort(self, *keys, reverse=False):
+        """Row order that sorts by keys (first key most significant)."""
+        if not keys:
+            raise TypeError("argsort() needs at least one column name")
+        if np is not None and not reverse:
+            # lexsort takes its most significant key last.
+            return np.lexsort([_as_numpy(self._columns[k]) for k in reversed(keys)]).tolist()
+        order = list(range(len(self)))
+        for key in reversed(keys):      # stable sorts, least significant first
+            order.sort(key=self._columns[key].__getitem__, reverse=reverse)
+        return order
+
+    def sort(self, *keys, reverse=False):
+        """Sort every column in place by one or more field names."""
+        self._columns = self._take(self.argsort(*keys, reverse=reverse))
+
+    def filter(self, mask):
+        """Return a new store with the rows where mask is true."""
+        return self[mask]
+
+    def export(self, name):
+        """Return column `name` as a memoryview sharing the store's memory."""
+        return memoryview(self._columns[name])
+
+    def to_objects(self):
+        """Materialise every row as a dataclass instance."""
+        return list(map(self.cls, *self._columns.values()))
+
+
+if __name__ == "__main__":
+    import importlib
+    import random
+    import tracemalloc
+    from dataclasses import dataclass
+
+    bench = importlib.import_module("08_benchmark")
+
+    print("=" * 60)
+    print("1. POINTS AS COLUMNS")
+    print("=" * 60)
+
+    @dataclass
+    class Point:
+        x: float
+        y: float
+
+    points = ColumnStore(Point, [Point(1.0, 2.0), Point(-3.0, 4.0), Point(5.0, -6.0)])
+    points.append((0.5, 0.5))
+    print(f"points = {points}, points[0] = {points[0]}")
+    p = points[1]
+    p.x = 30.0
+    print(f"view write: points[1].x = 30.0 -> {points[1]}  (same memory: {points['x'][1]})")
+    print(f"points[0] == Point(1.0, 2.0): {points[0] == Point(1.0, 2.0)}")
+
+    print("\n" + "=" * 60)
+    print("2. WHOLE-COLUMN OPERATIONS")
+    print("=" * 60)
+
+    points["x"] = points["x"] * 2 + 1
+    print(f"x * 2 + 1:          {points['x']}")
+    distance = (points["x"] ** 2 + points["y"] ** 2) ** 0.5
+    print(f"distance:           {distance}")
+    positive = points[(points["x"] > 0) & (points["y"] > 0)]
+    print(f"x > 0 and y > 0:    {[str(p) for p in positive]}")
+    points.sort("y")
+    print(f"sorted by y:        {[p.y for p in points]}")
+    # An int column to a negative power becomes a float column. Under NumPy
+    # the exponents are a NumPy-backed Column here, the backend's usual case.
+    counts = Column(array("q", [2, 3, 4]))
+    exponents = Column(array("q", [1, 0, 2])) - 2
+    powers = counts ** exponents
+    assert powers.typecode == "d" and list(powers) == [2 ** -1, 3 ** -2, 1.0], powers
+    assert list(counts ** -1) == [2 ** -1, 3 ** -1, 4 ** -1] and list(counts ** 2) == [4, 9, 16]
+    print(f"[2, 3, 4] ** [-1, -2, 0]: {powers}")
+    view = points.export("x")
+    print(f"export('x'):        {view}, format {view.format!r}, {view.nbytes} bytes, "
+          f"{view.tolist()}")
+
+    print("\n" + "=" * 60)
+    print("3. ONE MILLION POINTS")
+    print("=" * 60)
+
+    print(f"NumPy available: {np is not None}")
+    random.seed(0)
+    n = 1_000_000
+    xs = [random.uniform(-100, 100) for _ in range(n)]
+    ys = [random.uniform(-100, 100) for _ in range(n)]
+
+    tracemalloc.start()
+    objects = list(map(Point, xs, ys))
+    objects_size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    tracemalloc.start()
+    store = ColumnStore.from_columns(Point, x=xs, y=ys)
+    store_size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"list of Point: {objects_size / n:6.1f} bytes per point (plus the floats in xs, ys)")
+    print(f"ColumnStore:   {store_size / n:6.1f} bytes per point")
+
+    def shift_objects():
+        return [Point(p.x + 1.0, p.y * 2.0) for p in objects]
+
+    def shift_columns():
+        return ColumnStore.from_columns(Point, x=store["x"] + 1.0, y=store["y"] * 2.0)
+
+    def filter_objects():
+        return [p for p in objects if p.x > 0]
+
+    def filter_columns():
+        return store[store["x"] > 0]
+
+    for label, fn in [("shift, list of Point", shift_objects),
+                      ("shift, ColumnStore", shift_columns),
+                      ("filter, list of Point", filter_objects),
+                      ("filter, ColumnStore", filter_columns),
+                      ("sort, list of Point", lambda: sorted(objects, key=lambda p: p.x)),
+                      ("sort, ColumnStore", lambda: store[store.argsort("x")])]:
+        r = bench.measure(fn, name=label, repeat=3, number=1, warmup=1)
+        print(f"{label:24} {bench.format_time(r.mean):>10}")
@@ -0,0 +1,184 @@
+#* Fibonacci in O(log n) without a cache
+# Both fibonacci examples in 01_Basic/07_decorators.py (@memoize and
+# @lru_cache) recurse n frames deep before the first result comes back, so
+# fibonacci(1500) dies with RecursionError, and every F(0)..F(n) stays cached
+# afterwards.
+#
+# Fast doubling needs neither recursion nor a cache. From F(k) and F(k+1):
+#     F(2k)   = F(k) * (2*F(k+1) - F(k))
+#     F(2k+1) = F(k)**2 + F(k+1)**2
+# Walking the bits of n from the top doubles k each step (and adds one when
+# the bit is set), so F(n) takes about log2(n) steps of three multiplications.
+#
+#   fib(n)            F(n), exact
+#   fib_mod(n, m)     F(n) % m with every intermediate reduced, so n can have
+#                     hundreds of digits
+#   fib_many(ns)      many indices at once: after the smallest one, each next
+#                     index is reached from the previous one (see _advance)
+#                     instead of from zero
+
+from operator import index
+
+_SMALL_GAP = 16         # below this, stepping with additions beats multiplying
+
+
+def _pair(n, mod=None):
+    """Return (F(n), F(n+1)), reduced mod `mod` if given."""
+    a, b = 0, 1
+    for bit in bin(n)[2:]:
+        c = a * (2 * b - a)
+        d = a * a + b * b
+        if mod is not None:
+            c %= mod
+            d %= mod
+        if bit == "1":
+            a, b = d, c + d
+            if mod is not None:
+                b %= mod
+        else:
+            a, b = c, d
+    if mod is not None:
+        return a % mod, b % mod
+    return a, b
+
+
+def _check(n):
+    n = index(n)
+    if n < 0:
+        raise ValueError(f"Fibonacci index must be non-negative, got {n}")
+    return n
+
+
+def fib(n):
+    """Return the n-th Fibonacci number (F(0) = 0, F(1) = 1)."""
+    return _pair(_check(n))[0]
+
+
+def fib_mod(n, m):
+    """
+    Return F(n) % m without ever building F(n).
+
+    Args:
+        n (int): Index, may be arbitrarily large
+        m (int): Modulus, at least 1
+    """
+    m = index(m)
+    if m < 1:
+        raise ValueError(f"Modulus must be at least 1, got {m}")
+    return _pair(_check(n), m)[0]
+
+
+def _advance(pair, gap, mod, gaps):
+    """Move (F(k), F(k+1)) forward to (F(k+gap), F(k+gap+1))."""
+    a, b = pair
+    if gap < _SMALL_GAP:
+        for _ in range(gap):
+            a, b = b, a + b
+            if mod is not None:
+                b %= mod
+        return a, b
+    # F(k+g) = F(k)F(g+1) + (F(k+1) - F(k))F(g),  F(k+g+1) = F(k+1)F(g+1) + F(k)F(g).
+    # F(g) and F(g+1) are much smaller than F(k) when the indices are close.
+    g0, g1 = gaps.get(gap) or gaps.setdefault(gap, _pair(gap, mod))
+    a, b = a * g1 + (b - a) * g0, b * g1 + a * g0
+    if mod is not None:
+        a, b = a % mod, b % mod
+    return a, b
+
+
+def fib_many(indices, mod=None):
+    """
+    Return [F(n) for n in indices], sharing work between the indices.
+
+    Args:
+        indices (Iterable[int]): Any order, duplicates allowed
+        mod (int | None): Reduce every result mod this number
+    """
+    indices = [_check(n) for n in indices]
+    if mod is not None and index(mod) < 1:
+        raise ValueError(f"Modulus must be at least 1, got {mod}")
+    results = {}
+    gaps = {}
+    previous = pair = None
+    for n in sorted(set(indices)):
+        pair = _pair(n, mod) if pair is None else _advance(pair, n - previous, mod, gaps)
+        results[n] = pair[0]
+        previous = n
+    return [results[n] for n in indices]
+
+
+if __name__ == "__main__":
+    import importlib
+    import sys
+    from functools import lru_cache
+
+    bench = importlib.import_module("08_benchmark")
+    memo = importlib.import_module("01_memoize")
+
+    @memo.memoize(maxsize=None)
+    def fibonacci_memoize(n):
+        if n < 2:
+            return n
+        return fibonacci_memoize(n - 1) + fibonacci_memoize(n - 2)
+
+    @lru_cache(maxsize=128)
+    def fibonacci_lru(n):
+        if n < 2:
+            return n
+        return fibonacci_lru(n - 1) + fibonacci_lru(n - 2)
+
+    print("=" * 60)
+    print("1. SAME ANSWERS, NO RECURSION")
+    print("=" * 60)
+
+    print(f"fib(5) = {fib(5)}, fib(100) = {fib(100)}")
+    assert [fib(n) for n in range(300)] == [fibonacci_lru(n) for n in range(300)]
+    for label, func in [("@memoize", fibonacci_memoize), ("@lru_cache", fibonacci_lru)]:
+        func.cache_clear()
+        try:
+            func(1500)
+        except RecursionError:
+            print(f"{label:11} fibonacci(1500) -> RecursionError "
+                  f"(limit {sys.getrecursionlimit()})")
+    print(f"fib(1500) has {len(str(fib(1500)))} digits")
+    print(f"fib(1_000_000) has {fib(1_000_000).bit_length()} bits")
+
+    print("\n" + "=" * 60)
+    print("2. HUGE n, MODULAR")
+    print("=" * 60)
+
+    n = 10 ** 100
+    print(f"fib_mod(10**100, 1_000_000_007) = {fib_mod(n, 1_000_000_007)}")
+    assert fib_mod(12345, 97) == fib(12345) % 97
+    print(f"last 10 digits of F(10**18): {fib_mod(10 ** 18, 10 ** 10):010d}")
+
+    print("\n" + "=" * 60)
+    print("3. MANY INDICES AT ONCE")
+    print("=" * 60)
+
+    wanted = list(range(100_000, 100_200, 5)) + [150_000, 200_000]
+    assert fib_many(wanted) == [fib(n) for n in wanted]
+    assert fib_many(wanted, mod=1000) == [fib_mod(n, 1000) for n in wanted]
+    for label, fn in [("one fib() per index", lambda: [fib(n) for n in wanted]),
+                      ("fib_many()", lambda: fib_many(wanted))]:
+        r = bench.measure(fn, name=label, repeat=10)
+        print(f"{label:22} {bench.format_time(r.mean):>10}")
+
+    print("\n" + "=" * 60)
+    print("4. AGAINST THE MEMOIZED VERSIONS")
+    print("=" * 60)
+
+    def cold(func, n):
+        func.cache_clear()
+        return func(n)
+
+    for n in (30, 300):
+        rows = [bench.measure(cold, fibonacci_memoize, n, name="@memoize, cold", repeat=10),
+                bench.measure(cold, fibonacci_lru, n, name="@lru_cache, cold", repeat=10),
+                bench.measure(fibonacci_lru, n, name="@lru_cache, cached", repeat=10),
+                bench.measure(fib, n, name="fib()", repeat=10)]
+        print(f"n = {n}:")
+        for r in rows:
+            print(f"  {r.name:20} {bench.format_time(r.mean):>10}")
+    print(f"entries kept alive by @memoize after n=300: "
+          f"{fibonacci_memoize.cache_info().currsize}, by fib(): 0")
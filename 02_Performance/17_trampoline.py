@@ -0,0 +1,406 @@
+#* Recursion without the call stack: @trampoline
+# The recursive fibonacci in 01_Basic/07_decorators.py uses one interpreter
+# frame per level, so deep inputs raise RecursionError, and raising
+# sys.setrecursionlimit() instead can crash the process with a C stack
+# overflow.
+#
+# @trampoline runs the recursion on a Python list instead. Write the function
+# as a generator and put `yield` in front of every recursive call:
+#
+#     @trampoline
+#     def sum_to(n):
+#         if n == 0:
+#             return 0
+#         return n + (yield sum_to(n - 1))
+#
+# Called from outside, sum_to(1_000_000) returns an int as usual. Inside a
+# running trampoline, sum_to(n - 1) only creates a suspended generator; the
+# `yield` hands it to the driver loop, which pushes it on its stack, runs it,
+# and sends its return value back. Depth is limited by memory, not by frames.
+# A call inside a running trampoline whose generator is never yielded (say
+# `n + sum_to(n - 1)`) raises a TypeError naming the function.
+#
+# Exceptions travel up the explicit stack like they would through frames, so
+# a caller can catch what a deeper level raised. Yielding anything that is
+# not a generator just sends it straight back, so `yield` on a plain value
+# (or on another, non-trampolined function's result) is harmless.
+#
+# Caching: put @memoize (01_memoize.py) or @lru_cache *below* @trampoline:
+#
+#     @trampoline
+#     @lru_cache(maxsize=None)
+#     def fibonacci(n): ...
+#
+# The cache then stores the generator for each argument. The driver records
+# every finished generator's return value (in a WeakKeyDictionary, so the
+# record lives exactly as long as the cache entry), and a cache hit that hands
+# back a finished generator is answered from that record. A generator that
+# finished by raising has its exception recorded the same way, and a cache
+# hit on it raises that exception again.
+#
+# Threads: a cache hands the same generator to every thread that asks, and a
+# generator can only be run by one of them. Each cached generator is claimed
+# by the first thread that reaches it; any other thread that needs it waits
+# for that one to finish it and then reads the recorded outcome.
+#
+# Cost: each level creates a generator, resumes it and catches its
+# StopIteration, about 2 us more than a plain call on CPython 3.11. That
+# is many times the cost of a body that does nothing but recurse, and under
+# the 2x bound checked in the demo once a level does a little real work.
+
+import inspect
+import threading
+import weakref
+from functools import wraps
+from threading import get_ident
+from types import GeneratorType
+
+_results = weakref.WeakKeyDictionary()     # finished generator -> its return value
+_errors = weakref.WeakKeyDictionary()      # generator that raised -> its exception
+_owners = {}                               # cached generator being run -> driving thread
+_finished = threading.Condition(threading.Lock())   # notified as cached generators finish
+
+
+class _Pending(threading.local):
+    gen = None              # returned by a call inside a driver, not yet yielded
+
+
+_pending = _Pending()
+
+
+def _outcome(gen):
+    """Return a finished generator's recorded value, or raise its recorded error."""
+    try:
+        return _results[gen]
+    except KeyError:
+        pass
+    try:
+        error = _errors[gen]
+    except KeyError:
+        raise RuntimeError("yielded a generator that already ran, outside "
+                           "this trampoline") from None
+    raise error
+
+
+def _record(gen, value=None, error=None):
+    with _finished:
+        if error is None:
+            _results[gen] = value
+        else:
+            _errors[gen] = error
+        _owners.pop(gen, None)
+        _finished.notify_all()
+
+
+def _acquire(gen, thread):
+    """
+    Make thread the one driver of a cached generator.
+
+    Returns False when gen has finished instead, after waiting for another
+    thread that was already running it; its outcome is then recorded.
+    """
+    owner = _owners.setdefault(gen, thread)
+    if owner != thread:
+        with _finished:
+            while gen in _owners:
+                _finished.wait()
+        return False
+    if gen.gi_frame is None:                # finished just before the claim
+        _owners.pop(gen, None)
+        return False
+    if gen.gi_suspended:
+        raise RecursionError("cyclic call: a result was requested while it is "
+                             "still being computed")
+    return True
+
+
+def _unyielded(gen, cause=None):
+    error = TypeError(f"{gen.__name__}() was called inside a running trampoline "
+                      f"without `yield` in front of it")
+    error.__cause__ = cause
+    return error
+
+
+def _run(gen, record):
+    """Drive gen and every generator it yields; return gen's return value."""
+    thread = get_ident()
+    if record and not _acquire(gen, thread):
+        return _outcome(gen)
+    stack = [gen]
+    push, pop = stack.append, stack.pop
+    send = gen.send
+    value = error = None
+    generator = GeneratorType
+    pending = _pending
+    while True:
+        try:
+            if error is None:
+                item = send(value)
+            else:
+                item = stack[-1].throw(error)
+                error = None
+        except StopIteration as stop:
+            error = None
+            if pending.gen is None:
+                value = stop.value
+                if record:
+                    _record(stack[-1], value)
+                pop()
+                if not stack:
+                    return value
+                send = stack[-1].send
+                continue
+            error, pending.gen = _unyielded(pending.gen), None
+        except BaseException as exc:
+            error = exc
+            if pending.gen is not None:
+                error, pending.gen = _unyielded(pending.gen, exc), None
+        else:
+            called = pending.gen
+            if called is not None:
+                pending.gen = None
+                if item is not called:
+                    error = _unyielded(called)
+                    continue
+            if type(item) is not generator:
+                value = item
+            elif item.gi_frame is None:
+                # Finished earlier, e.g. handed back again by a cache.
+                try:
+                    value = _outcome(item)
+                except BaseException as exc:
+                    error = exc
+            elif record:
+                try:
+                    runnable = _acquire(item, thread)
+                except RecursionError as exc:
+                    error = exc
+                    continue
+                if runnable:
+                    push(item)
+                    send = item.send
+                    value = None
+                else:
+                    try:
+                        value = _outcome(item)
+                    except BaseException as exc:
+                        error = exc
+            elif item.gi_suspended:
+                error = RecursionError("cyclic call: a result was requested while it is "
+                                       "still being computed")
+            else:
+                push(item)
+                send = item.send
+                value = None
+            continue
+
+        # The generator on top raised `error`: unwind it into its caller.
+        if record:
+            _record(stack[-1], error=error)
+        pop()
+        if not stack:
+            raise error
+        send = stack[-1].send
+        value = None
+
+
+def trampoline(func):
+    """
+    Run a generator-style recursive function on an explicit stack.
+
+    Recursive calls must be written as `yield func(...)`; see the module
+    comment. func may be wrapped in @memoize or @lru_cache.
+    """
+    record = not inspect.isgeneratorfunction(func)
+    running = set()         # threads currently driving func
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if get_ident() in running:
+            gen = _pending.gen = func(*args, **kwargs)    # the driver will run it
+            return gen
+        gen = func(*args, **kwargs)
+        if type(gen) is not GeneratorType:
+            return gen
+        if gen.gi_frame is None:
+            return _outcome(gen)                # cache hit on a finished call
+        thread = get_ident()
+        running.add(thread)
+        try:
+            return _run(gen, record)
+        finally:
+            running.discard(thread)
+    return wrapper
+
+
+if __name__ == "__main__":
+    import importlib
+    import sys
+    from functools import lru_cache
+
+    bench = importlib.import_module("08_benchmark")
+    memo = importlib.import_module("01_memoize")
+    fast = importlib.import_module("16_fibonacci")
+
+    print("=" * 60)
+    print("1. DEPTH LIMITED BY MEMORY, NOT FRAMES")
+    print("=" * 60)
+
+    def sum_to_recursive(n):
+        if n == 0:
+            return 0
+        return n + sum_to_recursive(n - 1)
+
+    @trampoline
+    def sum_to(n):
+        if n == 0:
+            return 0
+        return n + (yield sum_to(n - 1))
+
+    try:
+        sum_to_recursive(100_000)
+    except RecursionError:
+        print(f"plain recursion, n=100_000  -> RecursionError (limit {sys.getrecursionlimit()})")
+    print(f"@trampoline,    n=1_000_000 -> {sum_to(1_000_000)}")
+
+    print("\n" + "=" * 60)
+    print("2. WITH @memoize AND @lru_cache BELOW IT")
+    print("=" * 60)
+
+    @trampoline
+    @lru_cache(maxsize=None)
+    def fibonacci(n):
+        if n < 2:
+            return n
+        return (yield fibonacci(n - 1)) + (yield fibonacci(n - 2))
+
+    @trampoline
+    @memo.memoize(maxsize=None)
+    def fibonacci_memoize(n):
+        if n < 2:
+            return n
+        return (yield fibonacci_memoize(n - 1)) + (yield fibonacci_memoize(n - 2))
+
+    for label, func in [("@lru_cache", fibonacci), ("@memoize", fibonacci_memoize)]:
+        result = func(20_000)
+        print(f"{label:11} fibonacci(20_000) == fast doubling: {result == fast.fib(20_000)}, "
+              f"again (cached): {func(20_000) == result}, fibonacci(100) = {func(100)}")
+
+    print("\n" + "=" * 60)
+    print("3. EXCEPTIONS UNWIND THE EXPLICIT STACK")
+    print("=" * 60)
+
+    @trampoline
+    def depth_of(tree):
+        if not isinstance(tree, list):
+            raise TypeError(f"leaf must be a list, got {tree!r}")
+        deepest = 0
+        for child in tree:
+            deepest = max(deepest, (yield depth_of(child)))
+        return 1 + deepest
+
+    @trampoline
+    def safe_depth(tree):
+        try:
+            return (yield depth_of(tree))
+        except TypeError as e:
+            return f"TypeError caught one level up: {e}"
+
+    deep = []
+    for _ in range(50_000):
+        deep = [deep]
+    print(f"depth_of(50_000 nested lists) = {depth_of(deep)}")
+    print(safe_depth([[], [[], "oops"]]))
+
+    @trampoline
+    def forgot_yield(n):
+        if n == 0:
+            return 0
+        return n + forgot_yield(n - 1)
+        yield
+
+    try:
+        forgot_yield(3)
+        raise AssertionError("expected a TypeError")
+    except TypeError as e:
+        print(f"TypeError: {e}")
+
+    print("\n" + "=" * 60)
+    print("4. ONE CACHE, SEVERAL THREADS")
+    print("=" * 60)
+
+    @trampoline
+    @lru_cache(maxsize=None)
+    def shared_fib(n):
+        if n < 2:
+            return n
+        return (yield shared_fib(n - 1)) + (yield shared_fib(n - 2))
+
+    results, failures = [], []
+
+    def worker():
+        try:
+            results.append(shared_fib(5_000))
+        except Exception as e:
+            failures.append(e)
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)         # switch threads as often as possible
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    sys.setswitchinterval(interval)
+    assert not failures and results == [fast.fib(5_000)] * 8, failures
+    print(f"8 threads, fibonacci(5_000): {len(results)} correct results, {len(failures)} errors")
+
+    print("\n" + "=" * 60)
+    print("5. OVERHEAD PER LEVEL")
+    print("=" * 60)
+
+    # Per level, the trampoline creates a generator, resumes it and catches
+    # its StopIteration where plain recursion makes one call. That is a fixed
+    # cost per level, so the ratio depends on how much the body itself does.
+    OVERHEAD_BOUND = 2.0    # trampolined / plain, for a body doing real work
+
+    def tree_fib(n):
+        return n if n < 2 else tree_fib(n - 1) + tree_fib(n - 2)
+
+    @trampoline
+    def tree_fib_trampolined(n):
+        if n < 2:
+            return n
+        return (yield tree_fib_trampolined(n - 1)) + (yield tree_fib_trampolined(n - 2))
+
+    words = "the quick brown fox jumps over the lazy dog".split() * 4
+
+    def index_words_recursive(n):
+        counts = {}
+        for word in words:
+            counts[word] = counts.get(word, 0) + 1
+        return counts["fox"] + (index_words_recursive(n - 1) if n else 0)
+
+    @trampoline
+    def index_words(n):
+        counts = {}
+        for word in words:
+            counts[word] = counts.get(word, 0) + 1
+        return counts["fox"] + ((yield index_words(n - 1)) if n else 0)
+
+    for label, plain, jumped, arg, levels, bounded in [
+        ("linear, empty body", sum_to_recursive, sum_to, 500, 501, False),
+        ("tree, empty body", tree_fib, tree_fib_trampolined, 18, 8361, False),
+        ("linear, 36-word body", index_words_recursive, index_words, 500, 501, True),
+    ]:
+        base = bench.measure(plain, arg, name="plain", repeat=10)
+        cand = bench.measure(jumped, arg, name="trampoline", repeat=10)
+        ratio = cand.mean / base.mean
+        per_level = (cand.mean - base.mean) / levels
+        line = (f"{label:21} plain {bench.format_time(base.mean):>9}  "
+                f"trampoline {bench.format_time(cand.mean):>9}  x{ratio:5.2f}  "
+                f"+{bench.format_time(per_level)}/level")
+        if bounded:
+            verdict = "within" if ratio <= OVERHEAD_BOUND else "OVER"
+            line += f"  ({verdict} the x{OVERHEAD_BOUND:.0f} bound)"
+        print(line)
@@ -0,0 +1,332 @@
+#* Micro-batching: many single calls, one bulk call
+# square(x), add(a, b) and calculate_area(radius) in 01_Basic/06_function.py
+# take one item per call. When each call really goes to a backend with a
+# fixed per-request cost (a database round trip, a model inference, a GPU
+# kernel launch), a hundred callers pay that cost a hundred times.
+#
+# @micro_batch decorates the *bulk* implementation and turns it into a
+# per-item function. Calls from any number of threads or coroutines are
+# queued; a batch is sent to the bulk function when it reaches max_size
+# items, or max_delay seconds after its first item arrived, whichever comes
+# first. max_delay is therefore the bound on the latency batching adds.
+#
+# The bulk function gets one list per parameter and returns one result per
+# item, in order:
+#
+#     @micro_batch(max_size=64, max_delay=0.002)
+#     def add(a_values, b_values):
+#         return [a + b for a, b in zip(a_values, b_values)]
+#
+#     add(5, 3)                 # blocks, returns 8
+#     add.submit(5, 3)          # concurrent.futures.Future
+#     await add.acall(5, 3)     # from a coroutine
+#
+# If the bulk function raises, every caller in that batch gets the
+# exception. An `async def` bulk function is batched per event loop and only
+# supports acall().
+
+import asyncio
+import inspect
+import threading
+import time
+import weakref
+from collections import namedtuple
+from concurrent.futures import Future
+from functools import update_wrapper
+
+BatchStats = namedtuple("BatchStats", ["calls", "batches", "full", "timed_out", "largest"])
+
+
+class MicroBatcher:
+    """
+    Per-item front end for a bulk function; see the module comment.
+
+    Args:
+        bulk (callable): Takes one list per parameter, returns a list of results
+        max_size (int): Flush as soon as this many calls are waiting
+        max_delay (float): Flush at most this many seconds after the first
+            call of a batch arrived
+    """
+
+    def __init__(self, bulk, max_size=128, max_delay=0.005):
+        if max_size < 1 or max_delay < 0:
+            raise ValueError("max_size must be >= 1 and max_delay >= 0")
+        self.bulk = bulk
+        self.max_size = max_size
+        self.max_delay = max_delay
+        self.arity = len([p for p in inspect.signature(bulk).parameters.values()
+                          if p.kind in (p.POSITIONAL_ONLY, p.POSITIONAL_OR_KEYWORD)])
+        self.is_async = inspect.iscoroutinefunction(bulk)
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._pending = []                  # [(args, future)]
+        self._deadline = None
+        self._flusher = None
+        self._loops = weakref.WeakKeyDictionary()   # event loop -> _LoopQueue
+        self._stats = [0, 0, 0, 0, 0]
+        update_wrapper(self, bulk)
+
+    def _check(self, args):
+        if len(args) != self.arity:
+            raise TypeError(f"{self.__name__}() takes {self.arity} argument(s) per call, "
+                            f"got {len(args)}")
+
+    def _columns(self, batch):
+        return [list(column) for column in zip(*(args for args, _ in batch))] \
+            or [[] for _ in range(self.arity)]
+
+    def _record(self, size, full):
+        with self._lock:
+            stats = self._stats
+            stats[0] += size
+            stats[1] += 1
+            stats[2 if full else 3] += 1
+            stats[4] = max(stats[4], size)
+
+    def stats(self):
+        with self._lock:
+            return BatchStats(*self._stats)
+
+    # -- threads ---------------------------------------------------------
+
+    def submit(self, *args):
+        """Queue one call; return a concurrent.futures.Future for its result."""
+        if self.is_async:
+            raise TypeError(f"{self.__name__} has an async bulk function; use acall()")
+        return self._enqueue(args, inline=True)
+
+    def __call__(self, *args):
+        return self.submit(*args).result()
+
+    def _enqueue(self, args, inline):
+        # inline=True lets the caller that fills a batch run it at once;
+        # otherwise the flusher thread is woken to do it.
+        self._check(args)
+        future = Future()
+        batch = None
+        with self._lock:
+            if self._flusher is None:
+                self._flusher = threading.Thread(
+                    target=self._flush_on_deadline, daemon=True,
+                    name=f"micro_batch-{self.__name__}")
+                self._flusher.start()
+            pending = self._pending
+            pending.append((args, future))
+            if len(pending) >= self.max_size:
+                if inline:
+                    batch, self._pending = pending[:self.max_size], pending[self.max_size:]
+                else:
+                    self._deadline = time.monotonic()
+                    self._wakeup.notify()
+            elif len(pending) == 1:
+                self._deadline = time.monotonic() + self.max_delay
+                self._wakeup.notify()
+        if batch is not None:
+            self._run(batch, full=True)
+        return future
+
+    def _flush_on_deadline(self):
+        with self._lock:
+            while True:
+                if not self._pending:
+                    self._wakeup.wait()
+                    continue
+                remaining = self._deadline - time.monotonic()
+                if remaining > 0:
+                    self._wakeup.wait(remaining)
+                    continue
+                pending = self._pending
+                full = len(pending) >= self.max_size
+                batch, self._pending = pending[:self.max_size], pending[self.max_size:]
+                self._lock.release()
+                try:
+                    self._run(batch, full=full)
+                finally:
+                    self._lock.acquire()
+
+    def _run(self, batch, full):
+        batch = [(args, f) for args, f in batch if f.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        self._record(len(batch), full)
+        try:
+            results = list(self.bulk(*self._columns(batch)))
+            if len(results) != len(batch):
+                raise ValueError(f"{self.__name__} returned {len(results)} results "
+                                 f"for {len(batch)} calls")
+        except BaseException as exc:
+            for _, future in batch:
+                future.set_exception(exc)
+            return
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    # -- coroutines ------------------------------------------------------
+
+    async def acall(self, *args):
+        """Queue one call from a coroutine and await its result."""
+        if not self.is_async:
+            # Sync bulk functions run on the flusher thread (or the thread that
+            # fills the batch), never on the event loop.
+            return await asyncio.wrap_future(self._enqueue(args, inline=False))
+        self._check(args)
+        loop = asyncio.get_running_loop()
+        queue = self._loops.get(loop)
+        if queue is None:
+            queue = self._loops[loop] = _LoopQueue(self, loop)
+        return await queue.put(args)
+
+
+class _LoopQueue:
+    """Pending calls of one event loop for an async bulk function."""
+
+    def __init__(self, batcher, loop):
+        self.batcher = batcher
+        self.loop = loop
+        self.pending = []
+        self.timer = None
+
+    def put(self, args):
+        future = self.loop.create_future()
+        self.pending.append((args, future))
+        if len(self.pending) >= self.batcher.max_size:
+            self.flush(full=True)
+        elif len(self.pending) == 1:
+            self.timer = self.loop.call_later(self.batcher.max_delay, self.flush)
+        return future
+
+    def flush(self, full=False):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        batch, self.pending = [(a, f) for a, f in self.pending if not f.cancelled()], []
+        if batch:
+            self.loop.create_task(self.run(batch, full))
+
+    async def run(self, batch, full):
+        batcher = self.batcher
+        batcher._record(len(batch), full)
+        try:
+            results = list(await batcher.bulk(*batcher._columns(batch)))
+            if len(results) != len(batch):
+                raise ValueError(f"{batcher.__name__} returned {len(results)} results "
+                                 f"for {len(batch)} calls")
+        except asyncio.CancelledError:
+            for _, future in batch:
+                future.cancel()
+            raise
+        except BaseException as exc:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            if not isinstance(exc, Exception):
+                raise
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+
+def micro_batch(func=None, *, max_size=128, max_delay=0.005):
+    """
+    Turn a bulk function into a per-item function that batches its callers.
+
+    Args:
+        max_size (int): Largest batch handed to the bulk function
+        max_delay (float): Longest a call waits for its batch to fill, in seconds
+    """
+    def decorator(bulk):
+        return MicroBatcher(bulk, max_size=max_size, max_delay=max_delay)
+
+    if func is None:
+        return decorator
+    return decorator(func)
+
+
+if __name__ == "__main__":
+    import importlib
+    from concurrent.futures import ThreadPoolExecutor
+
+    bench = importlib.import_module("08_benchmark")
+
+    ROUND_TRIP = 0.002      # fixed cost of one request to the pretend backend
+
+    print("=" * 60)
+    print("1. THE 06_function.py FUNCTIONS, BATCHED")
+    print("=" * 60)
+
+    @micro_batch(max_size=64, max_delay=0.002)
+    def square(xs):
+        return [x ** 2 for x in xs]
+
+    @micro_batch(max_size=64, max_delay=0.002)
+    def add(a_values, b_values):
+        return [a + b for a, b in zip(a_values, b_values)]
+
+    print(f"square(5) = {square(5)}, add(5, 3) = {add(5, 3)}")
+    with ThreadPoolExecutor(16) as pool:
+        squares = list(pool.map(square, range(200)))
+    print(f"200 squares from 16 threads: correct = {squares == [x * x for x in range(200)]}, "
+          f"{square.stats()}")
+    try:
+        add(1)
+    except TypeError as e:
+        print(f"add(1) -> TypeError: {e}")
+
+    print("\n" + "=" * 60)
+    print("2. THROUGHPUT AGAINST A BACKEND WITH A ROUND TRIP")
+    print("=" * 60)
+
+    connection = threading.Lock()      # the backend serves one request at a time
+
+    def calculate_area(radius):
+        with connection:
+            time.sleep(ROUND_TRIP)
+        return 3.14159 * radius ** 2
+
+    @micro_batch(max_size=64, max_delay=0.002)
+    def calculate_areas(radii):
+        with connection:
+            time.sleep(ROUND_TRIP)      # one round trip for the whole batch
+        return [3.14159 * r ** 2 for r in radii]
+
+    radii = [float(r) for r in range(1000)]
+    for label, func in [("one request per call", calculate_area),
+                        ("micro-batched", calculate_areas)]:
+        latencies = []
+
+        def timed(r, func=func, latencies=latencies):
+            start = time.perf_counter()
+            result = func(r)
+            latencies.append(time.perf_counter() - start)
+            return result
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(32) as pool:
+            areas = list(pool.map(timed, radii))
+        elapsed = time.perf_counter() - start
+        latencies.sort()
+        print(f"{label:21} {len(radii) / elapsed:8.0f} calls/s  "
+              f"p50 {bench.format_time(bench.percentile(latencies, 50)):>9}  "
+              f"p99 {bench.format_time(bench.percentile(latencies, 99)):>9}")
+    print(f"batches: {calculate_areas.stats()}")
+
+    print("\n" + "=" * 60)
+    print("3. COROUTINES")
+    print("=" * 60)
+
+    @micro_batch(max_size=100, max_delay=0.002)
+    async def fetch_areas(radii):
+        await asyncio.sleep(ROUND_TRIP)
+        return [3.14159 * r ** 2 for r in radii]
+
+    async def main():
+        start = time.perf_counter()
+        areas = await asyncio.gather(*(fetch_areas.acall(r) for r in radii))
+        mixed = await asyncio.gather(*(square.acall(x) for x in range(10)))
+        return areas, mixed, time.perf_counter() - start
+
+    areas, mixed, elapsed = asyncio.run(main())
+    print(f"{len(areas)} awaited calls in {bench.format_time(elapsed)}, "
+          f"{fetch_areas.stats()}")
+    print(f"sync bulk function from coroutines: {mixed}")
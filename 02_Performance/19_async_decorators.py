@@ -0,0 +1,283 @@
+#* Decorators that understand `async def`
+# Every decorator in 01_Basic/07_decorators.py assumes a plain function. Put
+# one on an `async def` and the wrapper just returns the coroutine object:
+#   - timer measures how long it took to *create* the coroutine (~0 s)
+#   - memoize caches the coroutine object, and the second caller gets a
+#     coroutine that has already been awaited (RuntimeError)
+#   - retry's try/except never sees the exception, it happens at await time
+#   - require_auth and CountCalls run, but other decorators stacked on top
+#     can no longer tell the result is a coroutine function
+#
+# function_kind() classifies a callable once, at decoration time, as SYNC,
+# COROUTINE or ASYNC_GENERATOR. The decorators in this folder use it to pick
+# a native wrapper of the same kind:
+#   01_memoize.memoize               caches awaited results; an async
+#                                    generator's items are cached once it has
+#                                    been iterated to the end, then replayed
+#   03_timing_registry.timer         records awaited wall time (for async
+#                                    generators, first item to exhaustion)
+#   04_async_logging.log_function_call  logs after the await completes
+#   05_retry.retry                   awaits asyncio.sleep() between attempts;
+#                                    async generators are retried only until
+#                                    their first item, never mid-stream
+#   06_count_calls.CountCalls        stays a coroutine function itself
+#   require_auth (below)             awaits an async check if given one
+
+import functools
+import inspect
+from functools import wraps
+
+SYNC = "sync"
+COROUTINE = "coroutine"
+ASYNC_GENERATOR = "async generator"
+
+
+def function_kind(func):
+    """
+    Return SYNC, COROUTINE or ASYNC_GENERATOR for any callable.
+
+    Looks through functools.partial and bound methods, and at the __call__
+    of callable objects (so a CountCalls wrapping an `async def` counts as a
+    coroutine function).
+    """
+    while True:
+        if isinstance(func, functools.partial):
+            func = func.func
+        elif inspect.ismethod(func):
+            func = func.__func__
+        else:
+            break
+    if not inspect.isfunction(func) and not inspect.isbuiltin(func):
+        func = getattr(type(func), "__call__", func)
+    if inspect.iscoroutinefunction(func):
+        return COROUTINE
+    if inspect.isasyncgenfunction(func):
+        return ASYNC_GENERATOR
+    return SYNC
+
+
+def _allow_all(*args, **kwargs):
+    return True
+
+
+def require_auth(func=None, *, check=_allow_all):
+    """
+    Refuse calls that check(*args, **kwargs) does not approve.
+
+    Args:
+        check (callable): Returns true for authenticated calls; may be an
+            `async def` when the decorated function is async. The default
+            approves everything, like the tutorial version.
+    """
+    check_is_async = function_kind(check) == COROUTINE
+
+    def decorator(f):
+        kind = function_kind(f)
+        if check_is_async and kind == SYNC:
+            raise TypeError(f"{f.__qualname__} is synchronous; it cannot await the "
+                            f"async check {check.__qualname__}")
+
+        async def allowed(args, kwargs):
+            if check_is_async:
+                return await check(*args, **kwargs)
+            return check(*args, **kwargs)
+
+        if kind == COROUTINE:
+            @wraps(f)
+            async def async_wrapper(*args, **kwargs):
+                if not await allowed(args, kwargs):
+                    raise PermissionError("Authentication required")
+                return await f(*args, **kwargs)
+            return async_wrapper
+
+        if kind == ASYNC_GENERATOR:
+            @wraps(f)
+            async def agen_wrapper(*args, **kwargs):
+                if not await allowed(args, kwargs):
+                    raise PermissionError("Authentication required")
+                async for item in f(*args, **kwargs):
+                    yield item
+            return agen_wrapper
+
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            if not check(*args, **kwargs):
+                raise PermissionError("Authentication required")
+            return f(*args, **kwargs)
+        return wrapper
+
+    if func is None:
+        return decorator
+    return decorator(func)
+
+
+if __name__ == "__main__":
+    import asyncio
+    import importlib
+    import logging
+    import sys
+    import time
+
+    memo = importlib.import_module("01_memoize")
+    timing = importlib.import_module("03_timing_registry")
+    quiet_log = importlib.import_module("04_async_logging")
+    retrying = importlib.import_module("05_retry")
+    counting = importlib.import_module("06_count_calls")
+
+    def tutorial_timer(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.time()
+            result = func(*args, **kwargs)
+            print(f"  tutorial timer: {func.__name__} took {time.time() - start:.4f} seconds")
+            return result
+        return wrapper
+
+    def tutorial_memoize(func):
+        cache = {}
+        @wraps(func)
+        def wrapper(*args):
+            if args not in cache:
+                cache[args] = func(*args)
+            return cache[args]
+        return wrapper
+
+    print("=" * 60)
+    print("1. THE DETECTOR")
+    print("=" * 60)
+
+    async def fetch(x):
+        return x
+
+    async def stream(n):
+        for i in range(n):
+            yield i
+
+    class Service:
+        async def handle(self, request):
+            return request
+
+    for label, obj in [("def", time.sleep), ("async def", fetch), ("async generator", stream),
+                       ("partial(async def)", functools.partial(fetch, 1)),
+                       ("bound async method", Service().handle),
+                       ("CountCalls(async def)", counting.CountCalls(fetch))]:
+        print(f"{label:22} -> {function_kind(obj)}")
+
+    print("\n" + "=" * 60)
+    print("2. WHAT THE TUTORIAL DECORATORS DO TO async def")
+    print("=" * 60)
+
+    registry = timing.TimingRegistry()
+
+    @tutorial_timer
+    async def slow_tutorial():
+        await asyncio.sleep(0.1)
+
+    @registry.timer(name="slow")
+    async def slow():
+        await asyncio.sleep(0.1)
+
+    computed = []
+
+    @tutorial_memoize
+    async def lookup_tutorial(key):
+        computed.append(key)
+        return key.upper()
+
+    @memo.memoize
+    async def lookup(key):
+        computed.append(key)
+        await asyncio.sleep(0.01)
+        return key.upper()
+
+    async def section_two():
+        await slow_tutorial()
+        await slow()
+        print(f"  03 timer: slow took {registry.snapshot()['slow'].mean_ns / 1e9:.4f} seconds")
+        await lookup_tutorial("a")
+        try:
+            await lookup_tutorial("a")
+        except RuntimeError as e:
+            print(f"  tutorial memoize, second await -> RuntimeError: {e}")
+        computed.clear()
+        print(f"  01 memoize: {await lookup('a')!r}, {await lookup('a')!r}, "
+              f"computed {len(computed)} time(s), {lookup.cache_info()}")
+
+    asyncio.run(section_two())
+
+    print("\n" + "=" * 60)
+    print("3. RETRY WITHOUT BLOCKING THE LOOP")
+    print("=" * 60)
+
+    attempts = []
+
+    @retrying.retry(max_attempts=4, delay=0.05, jitter=False)
+    async def flaky():
+        attempts.append(time.perf_counter())
+        if len(attempts) < 3:
+            raise ConnectionError("backend not ready")
+        return "ok"
+
+    async def ticker(ticks):
+        while True:
+            ticks.append(1)
+            await asyncio.sleep(0.01)
+
+    async def section_three():
+        ticks = []
+        tick_task = asyncio.create_task(ticker(ticks))
+        result = await flaky()
+        tick_task.cancel()
+        print(f"  flaky() = {result!r} after {len(attempts)} attempts; "
+              f"the loop ticked {len(ticks)} times meanwhile")
+
+    asyncio.run(section_three())
+
+    print("\n" + "=" * 60)
+    print("4. THE WHOLE STACK ON COROUTINES AND ASYNC GENERATORS")
+    print("=" * 60)
+
+    log = logging.getLogger("async-demo")
+    log.setLevel(logging.INFO)
+    log.propagate = False
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("  %(levelname)s: %(message)s"))
+    log.addHandler(handler)
+
+    tokens = {"secret"}
+
+    async def token_valid(token, *args, **kwargs):
+        await asyncio.sleep(0)          # e.g. ask an auth service
+        return token in tokens
+
+    @registry.timer(name="get_user")
+    @quiet_log.log_function_call(logger=log)
+    @require_auth(check=token_valid)
+    @retrying.retry(max_attempts=2, delay=0)
+    @counting.CountCalls
+    async def get_user(token, user_id):
+        await asyncio.sleep(0.01)
+        return {"id": user_id}
+
+    @memo.memoize
+    @require_auth(check=token_valid)
+    async def pages(token, count):
+        for i in range(count):
+            await asyncio.sleep(0)
+            yield f"page {i}"
+
+    async def section_four():
+        print(f"  get_user -> {await get_user('secret', 7)}")
+        try:
+            await get_user("stolen", 7)
+        except PermissionError as e:
+            print(f"  get_user('stolen', 7) -> PermissionError: {e}")
+        first = [p async for p in pages("secret", 3)]
+        again = [p async for p in pages("secret", 3)]
+        print(f"  pages: {first}, replayed from cache: {again == first}, "
+              f"{pages.cache_info()}")
+
+    asyncio.run(section_four())
+    counter = inspect.unwrap(get_user, stop=lambda f: isinstance(f, counting.CountCalls))
+    print(f"  get_user ran {counter.count} time(s), "
+          f"timer saw {registry.snapshot()['get_user'].count} call(s)")
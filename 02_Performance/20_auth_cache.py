@@ -0,0 +1,342 @@
+#* Cached authentication decisions
+# require_auth in 01_Basic/07_decorators.py (and its async-aware version in
+# 19_async_decorators.py) runs the authentication check on every call. With
+# a real token verifier that is a signature check or a network lookup per
+# request, usually the most expensive thing a hot endpoint does.
+#
+# AuthCache remembers the verifier's answer per credential:
+#   - a valid token is cached for `ttl` seconds, but never past the expiry
+#     the verifier reported for it
+#   - a rejected token is cached for `negative_ttl` seconds, so a client
+#     hammering with a bad token costs one verification, not one per request
+#   - revoke(token) drops the cached answer and keeps rejecting the token
+#     until it would have expired anyway, even if the verifier (say, a
+#     stateless signature check) would still accept it
+#   - concurrent misses for the same token share one verification
+#     (SingleFlight / AsyncSingleFlight from 01_memoize.py)
+#   - the number of cached tokens is bounded; the least recently used goes,
+#     and so is the number of remembered revocations
+#
+# The verifier takes a token and returns a Verification. It may be an
+# `async def`; use acheck() (or the async wrapper from require()) then.
+# acheck() with a plain verifier runs it in the loop's default executor, so
+# a slow verification does not block the event loop.
+
+import asyncio
+import importlib
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+memo = importlib.import_module("01_memoize")
+async_support = importlib.import_module("19_async_decorators")
+
+Verification = namedtuple("Verification", ["valid", "principal", "expires_at"])
+Verification.__doc__ = """Verifier result; expires_at is a time.time() timestamp or None."""
+
+AuthCacheInfo = namedtuple(
+    "AuthCacheInfo", ["hits", "negative_hits", "misses", "verifications", "revoked", "currsize"]
+)
+
+REJECTED = Verification(False, None, None)
+
+
+def first_argument(*args, **kwargs):
+    """
+    Default credential extractor: a `token` keyword or the first argument.
+
+    On a method the first argument is `self`; use method_argument there.
+    """
+    if "token" in kwargs:
+        return kwargs["token"]
+    return args[0] if args else None
+
+
+def method_argument(self, *args, **kwargs):
+    """Credential extractor for methods: like first_argument, skipping self."""
+    return first_argument(*args, **kwargs)
+
+
+class AuthCache:
+    """
+    Per-credential cache in front of a token verifier.
+
+    Args:
+        verifier (callable): token -> Verification; may be `async def`
+        ttl (float): Longest a positive answer is reused, in seconds
+        negative_ttl (float): How long a rejection is reused, in seconds
+        maxsize (int): Most tokens remembered at once
+        clock (callable): Returns the current time.time()-style timestamp
+    """
+
+    def __init__(self, verifier, *, ttl=60.0, negative_ttl=5.0, maxsize=10_000,
+                 clock=time.time):
+        self.verifier = verifier
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.maxsize = maxsize
+        self.clock = clock
+        self.is_async = async_support.function_kind(verifier) == async_support.COROUTINE
+        self._entries = OrderedDict()       # token -> (Verification, reuse_until)
+        self._revoked = {}                  # token -> keep rejecting until
+        self._lock = threading.Lock()
+        self._flights = memo.SingleFlight()
+        self._async_flights = memo.AsyncSingleFlight()
+        self._stats = [0, 0, 0, 0]          # hits, negative hits, misses, verifications
+
+    def _cached(self, token, now, count=True):
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is not None:
+                if entry[1] > now:
+                    self._entries.move_to_end(token)
+                    self._stats[0 if entry[0].valid else 1] += 1
+                    return entry[0]
+                del self._entries[token]
+            if count:
+                self._stats[2] += 1
+            until = self._revoked.get(token)
+            if until is not None:
+                if until > now:
+                    return REJECTED
+                del self._revoked[token]
+            return None
+
+    def _store(self, token, result):
+        now = self.clock()
+        if result.valid:
+            until = now + self.ttl
+            if result.expires_at is not None:
+                until = min(until, result.expires_at)
+        else:
+            until = now + self.negative_ttl
+        with self._lock:
+            self._stats[3] += 1
+            if token in self._revoked and result.valid:
+                return REJECTED     # revoked while we were verifying
+            if until > now:
+                self._entries[token] = (result, until)
+                self._entries.move_to_end(token)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return result
+
+    def _verify(self, token):
+        # The previous leader may have stored it between our miss and now.
+        result = self._cached(token, self.clock(), count=False)
+        if result is not None:
+            return result
+        return self._store(token, self.verifier(token))
+
+    async def _verify_async(self, token):
+        result = self._cached(token, self.clock(), count=False)
+        if result is not None:
+            return result
+        if self.is_async:
+            return self._store(token, await self.verifier(token))
+        # A sync verifier may block (network, slow crypto): keep it off the loop.
+        loop = asyncio.get_running_loop()
+        return self._store(token, await loop.run_in_executor(None, self.verifier, token))
+
+    def check(self, token):
+        """Return the (possibly cached) Verification for token."""
+        if self.is_async:
+            raise TypeError("the verifier is async; use `await cache.acheck(token)`")
+        if token is None:
+            return REJECTED
+        result = self._cached(token, self.clock())
+        if result is not None:
+            return result
+        return self._flights.do(token, self._verify, token)
+
+    async def acheck(self, token):
+        """Like check(), from a coroutine; works with sync and async verifiers."""
+        if token is None:
+            return REJECTED
+        result = self._cached(token, self.clock())
+        if result is not None:
+            return result
+        return await self._async_flights.do(token, self._verify_async, token)
+
+    def revoke(self, token, until=None):
+        """
+        Reject token from now on, whatever the verifier says.
+
+        Args:
+            until (float | None): Timestamp after which the revocation may be
+                forgotten, normally the token's own expiry. None keeps it
+                forever; a known expiry from the cache is used when available.
+
+        At most maxsize revocations are kept: past that, expired ones are
+        dropped, then the ones that expire soonest.
+        """
+        with self._lock:
+            entry = self._entries.pop(token, None)
+            if until is None and entry is not None:
+                until = entry[0].expires_at
+            revoked = self._revoked
+            revoked[token] = until if until is not None else float("inf")
+            if len(revoked) > self.maxsize:
+                now = self.clock()
+                for stale in [t for t, u in revoked.items() if u <= now]:
+                    del revoked[stale]
+                while len(revoked) > self.maxsize:
+                    del revoked[min(revoked, key=revoked.get)]
+
+    def invalidate(self, token=None):
+        """Forget the cached answer for token (or for every token)."""
+        with self._lock:
+            if token is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(token, None)
+
+    def cache_info(self):
+        with self._lock:
+            return AuthCacheInfo(*self._stats, len(self._revoked), len(self._entries))
+
+    def require(self, func=None, *, credential=first_argument):
+        """
+        require_auth backed by this cache.
+
+        Args:
+            credential (callable): Pulls the token out of the call's
+                arguments; by default a `token` keyword or the first argument.
+                For methods, whose first argument is self, pass
+                credential=method_argument.
+        """
+        if self.is_async:
+            async def check(*args, **kwargs):
+                return (await self.acheck(credential(*args, **kwargs))).valid
+        else:
+            def check(*args, **kwargs):
+                return self.check(credential(*args, **kwargs)).valid
+        return async_support.require_auth(func, check=check)
+
+
+if __name__ == "__main__":
+    import hmac
+    from concurrent.futures import ThreadPoolExecutor
+
+    bench = importlib.import_module("08_benchmark")
+
+    class StubVerifier:
+        """Pretend signature check: slow, counts its calls."""
+
+        def __init__(self, tokens, cost=0.001):
+            self.tokens = tokens        # token -> (principal, expires_at)
+            self.cost = cost
+            self.calls = 0
+            self.lock = threading.Lock()
+
+        def __call__(self, token):
+            with self.lock:
+                self.calls += 1
+            if self.cost:
+                time.sleep(self.cost)
+            if token not in self.tokens:
+                return REJECTED
+            principal, expires_at = self.tokens[token]
+            return Verification(expires_at > time.time(), principal, expires_at)
+
+    now = time.time()
+    verifier = StubVerifier({"alice-token": ("alice", now + 3600),
+                             "bob-token": ("bob", now + 0.2)})
+    auth = AuthCache(verifier, ttl=60, negative_ttl=0.5)
+
+    @auth.require
+    def get_profile(token, user_id):
+        return {"id": user_id}
+
+    print("=" * 60)
+    print("1. ONE VERIFICATION PER TOKEN")
+    print("=" * 60)
+
+    for _ in range(1000):
+        get_profile("alice-token", 1)
+    print(f"1000 calls with a good token -> {verifier.calls} verification(s)")
+    for _ in range(1000):
+        try:
+            get_profile("forged", 1)
+        except PermissionError:
+            pass
+    print(f"1000 calls with a bad token  -> {verifier.calls - 1} more verification(s) "
+          f"(negative cache)")
+    print(auth.cache_info())
+
+    print("\n" + "=" * 60)
+    print("2. TTL BOUNDED BY TOKEN EXPIRY, AND REVOCATION")
+    print("=" * 60)
+
+    print(f"bob: {get_profile('bob-token', 2)}")
+    time.sleep(0.25)
+    try:
+        get_profile("bob-token", 2)
+    except PermissionError:
+        print("bob's token expired after 0.2 s, although ttl=60: PermissionError")
+
+    auth.revoke("alice-token")
+    try:
+        get_profile("alice-token", 1)
+    except PermissionError:
+        print(f"alice revoked: PermissionError, verifier not asked "
+              f"(total calls still {verifier.calls})")
+
+    print("\n" + "=" * 60)
+    print("3. CONCURRENT MISSES SHARE ONE VERIFICATION")
+    print("=" * 60)
+
+    verifier.tokens["carol-token"] = ("carol", time.time() + 3600)
+    before = verifier.calls
+    with ThreadPoolExecutor(32) as pool:
+        list(pool.map(lambda _: get_profile("carol-token", 3), range(200)))
+    print(f"200 calls from 32 threads -> {verifier.calls - before} verification(s)")
+
+    async def verify_remote(token):
+        await asyncio.sleep(0.01)
+        return verifier(token)
+
+    async_auth = AuthCache(verify_remote)
+
+    @async_auth.require
+    async def get_orders(token):
+        return ["order-1"]
+
+    async def main():
+        before = verifier.calls
+        await asyncio.gather(*(get_orders("carol-token") for _ in range(100)))
+        print(f"100 concurrent awaits -> {verifier.calls - before} verification(s)")
+
+    asyncio.run(main())
+
+    print("\n" + "=" * 60)
+    print("4. COST PER REQUEST")
+    print("=" * 60)
+
+    key = b"server-secret"
+
+    def sign(principal):
+        return f"{principal}.{hmac.new(key, principal.encode(), 'sha256').hexdigest()}"
+
+    def hmac_verifier(token):
+        principal, _, signature = token.partition(".")
+        expected = hmac.new(key, principal.encode(), "sha256").hexdigest()
+        if not hmac.compare_digest(signature, expected):
+            return REJECTED
+        return Verification(True, principal, time.time() + 3600)
+
+    def rs256_like_verifier(token):
+        deadline = time.perf_counter() + 50e-6      # public-key checks take tens of us
+        while time.perf_counter() < deadline:
+            pass
+        return hmac_verifier(token)
+
+    token = sign("alice")
+    for label, verify in [("HMAC-SHA256", hmac_verifier), ("50 us signature", rs256_like_verifier)]:
+        uncached = async_support.require_auth(lambda token, user_id: user_id,
+                                              check=lambda token, user_id: verify(token).valid)
+        cached = AuthCache(verify).require(lambda token, user_id: user_id)
+        plain = bench.measure(uncached, token, 1, name="verify every call", repeat=15)
+        fast = bench.measure(cached, token, 1, name="AuthCache", repeat=15)
+        print(f"{label:16} verify every call {bench.format_time(plain.mean):>9}   "
+              f"AuthCache {bench.format_time(fast.mean):>9}")
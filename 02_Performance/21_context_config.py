@@ -0,0 +1,276 @@
+#* Context-local configuration overrides
+# temporary_change in 01_Basic/07_decorators.py overrides an attribute with
+# setattr() on a shared object:
+#
+#     with temporary_change(config, 'debug', True):
+#         handle(request)
+#
+# Every other thread and every other asyncio task sees debug=True for as
+# long as the block runs, and when two overlapping blocks restore in the
+# wrong order the "temporary" value sticks for good.
+#
+# ContextConfig keeps each setting in a contextvars.ContextVar:
+#   - override(config, debug=True) changes the value for the current thread
+#     or task only, and restores it with the ContextVar token on exit, so
+#     nested and interleaved overrides always unwind correctly
+#   - reading config.debug goes through a descriptor and one ContextVar.get(),
+#     falling back to the default when no override is active; that is about
+#     twice the cost of a plain attribute read (the demo measures it)
+#   - set_default(config, debug=True) changes the process-wide default, which
+#     is what start-up code usually wants; active overrides still win
+#
+# Settings belong to the class, not the instance: every instance of Config
+# shares the same defaults and sees the same overrides, like a module of
+# constants. Plain `config.debug = True` is refused for that reason, so it
+# cannot silently change every other instance too.
+#
+# Class attributes that are callable (functions, classes) are left alone, as
+# they are usually methods. Wrap one in Setting() to make it overridable:
+# `encoder = Setting(json.dumps)`.
+#
+# asyncio tasks start with a copy of their creator's context, so a task
+# created inside an override sees it. Threads start with an empty context:
+# run work in a pool through contextvars.copy_context().run to carry
+# overrides along.
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+
+class Setting:
+    """A class attribute of a ContextConfig whose overrides are context-local."""
+
+    __slots__ = ("name", "default", "var")
+
+    def __init__(self, default, name=None):
+        self.default = default
+        self.name = name
+        self.var = None
+
+    def __set_name__(self, owner, name):
+        self.name = name
+        self.var = ContextVar(f"{owner.__qualname__}.{name}")
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+        value = self.var.get(self)      # the Setting itself means "not overridden"
+        return self.default if value is self else value
+
+    def __set__(self, obj, value):
+        raise AttributeError(
+            f"{type(obj).__name__}.{self.name} is shared by every instance; use "
+            f"override() for a context-local change or set_default() for the default")
+
+    def __repr__(self):
+        return f"Setting({self.name}={self.default!r})"
+
+
+class ContextConfig:
+    """
+    Base class for configuration objects with context-local overrides.
+
+    Plain class attributes of a subclass become Settings; callable ones
+    need an explicit Setting():
+
+        class Config(ContextConfig):
+            debug = False
+            timeout = 30.0
+            encoder = Setting(json.dumps)
+
+    Settings are shared by all instances of the class.
+    """
+
+    __slots__ = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for name, value in list(vars(cls).items()):
+            if name.startswith("_") or callable(value) or isinstance(
+                    value, (Setting, property, classmethod, staticmethod)):
+                continue
+            setting = Setting(value)
+            setattr(cls, name, setting)
+            setting.__set_name__(cls, name)
+        cls._settings = {name: value for klass in reversed(cls.__mro__)
+                         for name, value in vars(klass).items() if isinstance(value, Setting)}
+
+    def snapshot(self):
+        """Return {name: value} as seen from the current context."""
+        return {name: getattr(self, name) for name in self._settings}
+
+    def __repr__(self):
+        values = ", ".join(f"{k}={v!r}" for k, v in self.snapshot().items())
+        return f"{type(self).__name__}({values})"
+
+
+def _check_settings(config, changes):
+    cls = config if isinstance(config, type) else type(config)
+    settings = cls._settings
+    unknown = sorted(set(changes) - set(settings))
+    if unknown:
+        hint = ("; wrap callable defaults in Setting(...)"
+                if any(callable(getattr(cls, name, None)) for name in unknown) else "")
+        raise AttributeError(f"{cls.__name__} has no setting(s) {', '.join(unknown)}{hint}")
+    return settings
+
+
+def set_default(config, **values):
+    """
+    Change the process-wide defaults of config's settings.
+
+    config may be the class or any instance; all instances share the change.
+    Active overrides keep precedence.
+    """
+    settings = _check_settings(config, values)
+    for name, value in values.items():
+        settings[name].default = value
+
+
+@contextmanager
+def override(config, **changes):
+    """
+    Override settings of config for the current thread or task only.
+
+    Usable as `with override(config, debug=True): ...`; the previous values
+    (including outer overrides) come back on exit, even after an exception.
+    """
+    settings = _check_settings(config, changes)
+    tokens = [(settings[name].var, settings[name].var.set(value))
+              for name, value in changes.items()]
+    try:
+        yield config
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+@contextmanager
+def temporary_change(obj, attr, value):
+    """Drop-in for the tutorial helper: context-local for ContextConfig objects."""
+    if isinstance(obj, ContextConfig):
+        with override(obj, **{attr: value}):
+            yield
+        return
+    original = getattr(obj, attr)
+    setattr(obj, attr, value)
+    try:
+        yield
+    finally:
+        setattr(obj, attr, original)
+
+
+if __name__ == "__main__":
+    import asyncio
+    import importlib
+    import threading
+    import time
+    from contextvars import copy_context
+    from concurrent.futures import ThreadPoolExecutor
+
+    bench = importlib.import_module("08_benchmark")
+
+    class LegacyConfig:
+        debug = False
+
+    class Config(ContextConfig):
+        debug = False
+        timeout = 30.0
+
+    def concurrent_requests(config):
+        """Two threads: one overrides debug for a while, the other just reads it."""
+        seen = []
+
+        def with_override():
+            with temporary_change(config, "debug", True):
+                time.sleep(0.05)
+
+        def plain_handler():
+            time.sleep(0.02)
+            seen.append(config.debug)
+
+        threads = [threading.Thread(target=with_override), threading.Thread(target=plain_handler)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return seen[0]
+
+    print("=" * 60)
+    print("1. OVERRIDES NO LONGER LEAK BETWEEN THREADS")
+    print("=" * 60)
+
+    print(f"setattr-based:  other thread saw debug={concurrent_requests(LegacyConfig())}")
+    print(f"ContextConfig:  other thread saw debug={concurrent_requests(Config())}")
+
+    print("\n" + "=" * 60)
+    print("2. ...OR BETWEEN ASYNCIO TASKS")
+    print("=" * 60)
+
+    config = Config()
+
+    async def handler(name, timeout=None):
+        if timeout is None:
+            await asyncio.sleep(0.01)
+            return f"{name}: timeout={config.timeout}"
+        with override(config, timeout=timeout):
+            await asyncio.sleep(0.01)
+            return f"{name}: timeout={config.timeout}"
+
+    async def main():
+        return await asyncio.gather(handler("slow-endpoint", 120.0), handler("default"),
+                                    handler("fast-endpoint", 1.0))
+
+    for line in asyncio.run(main()):
+        print(f"  {line}")
+
+    print("\n" + "=" * 60)
+    print("3. NESTED OVERRIDES RESTORE IN ORDER")
+    print("=" * 60)
+
+    print(f"start:         {config}")
+    with override(config, debug=True):
+        print(f"outer:         {config}")
+        with override(config, debug=False, timeout=5.0):
+            print(f"inner:         {config}")
+        print(f"back to outer: {config}")
+        try:
+            with override(config, timeout=0.1):
+                raise RuntimeError("boom")
+        except RuntimeError:
+            pass
+        print(f"after raise:   {config}")
+    print(f"end:           {config}")
+
+    set_default(config, timeout=60.0)   # process-wide default, e.g. at start-up
+    with override(config, debug=True), ThreadPoolExecutor(1) as pool:
+        plain = pool.submit(lambda: config.snapshot()).result()
+        carried = pool.submit(copy_context().run, config.snapshot).result()
+    print(f"pool thread, plain submit:        {plain}")
+    print(f"pool thread, copy_context().run:  {carried}")
+
+    class Output(ContextConfig):
+        encoder = Setting(repr)         # callable, so wrapped explicitly
+
+    output = Output()
+    with override(output, encoder=str):
+        inside = output.encoder("x")
+    print(f"callable setting: encoder('x') {output.encoder('x')}, overridden {inside}")
+    try:
+        config.debug = True
+        raise AssertionError("expected an AttributeError")
+    except AttributeError as e:
+        print(f"config.debug = True -> AttributeError: {e}")
+
+    print("\n" + "=" * 60)
+    print("4. READ COST")
+    print("=" * 60)
+
+    legacy = LegacyConfig()
+    for label, fn in [("plain class attribute", lambda: legacy.debug),
+                      ("Setting, no override", lambda: config.debug)]:
+        r = bench.measure(fn, name=label, repeat=15)
+        print(f"{label:24} {bench.format_time(r.mean):>10}")
+    with override(config, debug=True):
+        r = bench.measure(lambda: config.debug, name="Setting, overridden", repeat=15)
+        print(f"{r.name:24} {bench.format_time(r.mean):>10}")